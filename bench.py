@@ -0,0 +1,519 @@
+import argparse
+import collections
+import http.client
+import itertools
+import json
+import platform
+import os
+import random
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+import database
+from instrumentation import percentile
+
+INGREDIENT_COUNT = 1000
+INGREDIENTS_PER_RECIPE = (3, 12)
+ZIPF_EXPONENT = 1.1
+INSERT_CHUNK = 10000
+IMPORT_BUDGET_MS = 300
+STARTUP_BUDGET_MS = 600
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SUITE_SIZES = [1000, 100000]
+REGRESSION_THRESHOLD = 0.25
+NOISE_FLOOR = {"ms": 0.05, "us": 5}
+WRITE_BATCH = 200
+
+SERVER_CLIENTS = 8
+SERVER_DURATION = 10.0
+SERVER_WRITE_RATIO = 0.02
+SERVER_MIX = (("recipe", 0.5), ("recipe_304", 0.2), ("search", 0.2), ("pantry", 0.1))
+
+COLD_START_SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+import database
+database.DB_PATH = sys.argv[1]
+imported = time.perf_counter()
+database.init_db()
+opened = time.perf_counter()
+database.enable_recipe_index()
+indexed = time.perf_counter()
+print(f"{(imported - start) * 1000:.3f} {(opened - imported) * 1000:.3f} {(indexed - opened) * 1000:.3f}")
+'''
+
+STARTUP_SCRIPT = '''
+import os, sys, time
+start = time.perf_counter()
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PyQt6.QtWidgets import QApplication
+app = QApplication(sys.argv)
+import database
+database.DB_PATH = sys.argv[1]
+import recipe
+imported = time.perf_counter()
+window = recipe.MainWindow()
+window.show()
+app.processEvents()
+shown = time.perf_counter()
+while window.recipe_model.rowCount() == 0 and time.perf_counter() - shown < 30:
+    app.processEvents()
+    time.sleep(0.001)
+listed = time.perf_counter()
+print(f"{(imported - start) * 1000:.1f} {(shown - imported) * 1000:.1f} {(listed - start) * 1000:.1f}")
+'''
+
+
+def catalog_path(recipes, seed=0):
+    return os.path.join(tempfile.gettempdir(), f"recipes_bench_{recipes}_{seed}.db")
+
+
+def generate_catalog(path, recipes, ingredients=INGREDIENT_COUNT, seed=0):
+    # Детерминированный каталог: использование ингредиентов распределено по Ципфу.
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    rng = random.Random(seed)
+    conn = database.open_connection(path)
+    conn.execute("PRAGMA synchronous = OFF")
+    database.create_base_schema(conn)
+    database.migrate_db(conn)
+
+    cum_weights = list(itertools.accumulate(1 / rank ** ZIPF_EXPONENT for rank in range(1, ingredients + 1)))
+    ingredient_ids = list(range(1, ingredients + 1))
+    with conn:
+        conn.executemany("INSERT INTO ingredients (id, name) VALUES (?, ?)",
+                         [(i, f"ингредиент {i:05d}") for i in ingredient_ids])
+
+    recipe_id = 0
+    while recipe_id < recipes:
+        chunk = min(INSERT_CHUNK, recipes - recipe_id)
+        recipe_rows = []
+        link_rows = []
+        for _ in range(chunk):
+            recipe_id += 1
+            recipe_rows.append((recipe_id, f"Рецепт {recipe_id}", f"Инструкция к рецепту {recipe_id}.", "resources/def.png"))
+            count = rng.randint(*INGREDIENTS_PER_RECIPE)
+            picked = set(rng.choices(ingredient_ids, cum_weights=cum_weights, k=count))
+            link_rows.extend((recipe_id, ingredient_id) for ingredient_id in picked)
+        with conn:
+            conn.executemany("INSERT INTO recipes (id, name, instructions, image_path) VALUES (?, ?, ?, ?)", recipe_rows)
+            conn.executemany("INSERT INTO recipe_ingredients (recipe_id, ingredient_id) VALUES (?, ?)", link_rows)
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def ensure_catalog(recipes, seed=0, path=None):
+    path = path or catalog_path(recipes, seed)
+    if os.path.exists(path):
+        conn = sqlite3.connect(path)
+        count = conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0]
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        conn.close()
+        if count == recipes and version == database.SCHEMA_VERSION:
+            return path
+    print(f"[!] Генерируем каталог на {recipes} рецептов: {path}")
+    return generate_catalog(path, recipes, seed=seed)
+
+
+def use_catalog(path):
+    database.close_all_connections()
+    database.disable_recipe_index()
+    database.reset_ingredient_dictionary()
+    database.reset_recipe_cache()
+    database.disable_pantry_matrix()
+    database.DB_PATH = path
+
+
+def timeit(func, repeat):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def ingredient_queries():
+    return {
+        "popular": [1],
+        "popular x2": [1, 2],
+        "popular + mid": [1, 50],
+        "mid x3": [20, 40, 60],
+        "rare + popular": [900, 1],
+    }
+
+
+def bench_index(recipes, repeat):
+    use_catalog(ensure_catalog(recipes))
+    sql_results = {}
+    for label, ids in ingredient_queries().items():
+        sql_results[label] = (database.get_recipe_ids_by_ingredients(ids),
+                              timeit(lambda: database.get_recipe_ids_by_ingredients(ids), repeat))
+    start = time.perf_counter()
+    database.enable_recipe_index()
+    print(f"{recipes} рецептов, построение индекса: {time.perf_counter() - start:.2f} с")
+    for label, ids in ingredient_queries().items():
+        sql_ids, sql_time = sql_results[label]
+        index_ids = database.get_recipe_ids_by_ingredients(ids)
+        index_time = timeit(lambda: database.get_recipe_ids_by_ingredients(ids), repeat)
+        assert sql_ids == index_ids, label
+        print(f"  {label:<16} {len(index_ids):>8} рецептов  SQL {sql_time * 1000:9.3f} мс  индекс {index_time * 1000:9.3f} мс")
+
+
+def metric(value, unit):
+    return {"value": round(value, 4), "unit": unit}
+
+
+def suite_ingredient_queries(results, recipes, repeat):
+    for label, ids in ingredient_queries().items():
+        rows = len(database.get_recipes_by_ingredients(ids))
+        elapsed = timeit(lambda: database.get_recipes_by_ingredients(ids), repeat)
+        results[f"{recipes}/get_recipes_by_ingredients/{label}"] = dict(metric(elapsed * 1000, "ms"), rows=rows)
+
+
+def pantry_queries():
+    return {
+        "pantry 3": [1, 2, 3],
+        "pantry 10": list(range(1, 200, 20)),
+        "pantry 25 rare": list(range(500, 1000, 20)),
+    }
+
+
+def suite_pantry(results, recipes, repeat):
+    start = time.perf_counter()
+    database.get_pantry_matrix()
+    results[f"{recipes}/pantry_matrix_build"] = metric((time.perf_counter() - start) * 1000, "ms")
+    for label, ids in pantry_queries().items():
+        elapsed = timeit(lambda: database.rank_recipes_by_pantry(ids), repeat)
+        results[f"{recipes}/rank_recipes_by_pantry/{label}"] = metric(elapsed * 1000, "ms")
+
+
+def suite_recipe_by_id(results, recipes, repeat):
+    rng = random.Random(recipes)
+    ids = [rng.randint(1, recipes) for _ in range(1000)]
+    elapsed = timeit(lambda: [database.get_recipe_by_id(recipe_id) for recipe_id in ids], repeat)
+    results[f"{recipes}/get_recipe_by_id"] = metric(elapsed / len(ids) * 1e6, "us")
+
+
+def suite_writes(results, recipes):
+    # Пишем в копию каталога, чтобы не менять закэшированный файл.
+    rng = random.Random(recipes)
+    ingredient_ids = list(range(1, INGREDIENT_COUNT + 1))
+    start = time.perf_counter()
+    new_ids = [database.add_recipe(f"Новый рецепт {i}", "Инструкция.", "resources/def.png",
+                                   rng.sample(ingredient_ids, rng.randint(*INGREDIENTS_PER_RECIPE)))
+               for i in range(WRITE_BATCH)]
+    results[f"{recipes}/add_recipe"] = metric(WRITE_BATCH / (time.perf_counter() - start), "ops/s")
+    start = time.perf_counter()
+    for recipe_id in new_ids:
+        database.update_recipe(recipe_id, f"Изменённый рецепт {recipe_id}", "Новая инструкция.", "resources/def.png",
+                               rng.sample(ingredient_ids, rng.randint(*INGREDIENTS_PER_RECIPE)))
+    results[f"{recipes}/update_recipe"] = metric(WRITE_BATCH / (time.perf_counter() - start), "ops/s")
+
+
+def suite_cold_start(results, recipes, path, repeat):
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", COLD_START_SCRIPT, path], cwd=PROJECT_DIR,
+                                capture_output=True, text=True, check=True).stdout.split()
+        runs.append([float(value) for value in output[-3:]])
+    imported, opened, indexed = (min(column) for column in zip(*runs))
+    results[f"{recipes}/import_database"] = metric(imported, "ms")
+    results[f"{recipes}/init_db"] = metric(opened, "ms")
+    results[f"{recipes}/enable_recipe_index"] = metric(indexed, "ms")
+
+
+_app = None
+
+
+def qt_app():
+    # QApplication живёт до конца процесса: с ним умирают синглтоны воркера и миниатюр.
+    global _app
+    if _app is None:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6.QtWidgets import QApplication
+        _app = QApplication.instance() or QApplication(sys.argv)
+    return _app
+
+
+def suite_views(results, recipes, repeat):
+    app = qt_app()
+    import recipe
+    import db_worker
+
+    worker = db_worker.get_database_worker()
+
+    def wait_worker():
+        while worker._callbacks:
+            app.processEvents()
+            time.sleep(0.0005)
+        app.processEvents()
+
+    window = recipe.MainWindow()
+    window.show()
+    wait_worker()
+    recipe_ids, names, _ = recipe.find_recipes("")
+    ids = database.get_recipe_ids_by_ingredients([1])
+
+    def display(recipe_ids, names=None):
+        # Без готовых названий первая страница приходит из потока базы — ждём её.
+        window.display_recipes(recipe_ids, names)
+        wait_worker()
+
+    elapsed = timeit(lambda: display(recipe_ids, names), repeat)
+    results[f"{recipes}/display_recipes/all"] = dict(metric(elapsed * 1000, "ms"), rows=len(recipe_ids))
+    elapsed = timeit(lambda: display(ids), repeat)
+    results[f"{recipes}/display_recipes/popular"] = dict(metric(elapsed * 1000, "ms"), rows=len(ids))
+
+    view = window.listView_recipes
+    model = view.model()
+    rows = min(model.rowCount(), 50)
+    if not rows:
+        raise RuntimeError(f"список пуст после display_recipes: {len(ids)} id, строк не загружено")
+
+    def select_rows():
+        for row in range(rows):
+            view.setCurrentIndex(model.index(row, 0))
+            wait_worker()
+
+    elapsed = timeit(select_rows, repeat)
+    results[f"{recipes}/load_recipe"] = metric(elapsed / rows * 1000, "ms")
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+
+
+def run_suite(sizes, repeat, views=True):
+    results = {}
+    for recipes in sizes:
+        print(f"[!] Каталог на {recipes} рецептов", file=sys.stderr)
+        path = ensure_catalog(recipes)
+        suite_cold_start(results, recipes, path, repeat)
+        use_catalog(path)
+        database.enable_recipe_index()
+        suite_ingredient_queries(results, recipes, repeat)
+        suite_recipe_by_id(results, recipes, repeat)
+        suite_pantry(results, recipes, repeat)
+        if views:
+            suite_views(results, recipes, repeat)
+        with tempfile.TemporaryDirectory() as tmp:
+            copy_path = os.path.join(tmp, "recipes.db")
+            shutil.copy(path, copy_path)
+            use_catalog(copy_path)
+            database.enable_recipe_index()
+            suite_writes(results, recipes)
+            use_catalog(path)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare_results(old, new, threshold=REGRESSION_THRESHOLD):
+    # Время растёт — хуже, пропускная способность (ops/s) падает — хуже.
+    regressions = []
+    for key, current in new["results"].items():
+        previous = old["results"].get(key)
+        if not previous or previous["unit"] != current["unit"] or not previous["value"]:
+            continue
+        if abs(current["value"] - previous["value"]) < NOISE_FLOOR.get(current["unit"], 0):
+            continue
+        ratio = current["value"] / previous["value"]
+        if current["unit"] == "ops/s":
+            ratio = 1 / ratio if ratio else float("inf")
+        if ratio > 1 + threshold:
+            regressions.append((key, previous["value"], current["value"], current["unit"], ratio))
+    return regressions
+
+
+def bench_suite(sizes, repeat, output=None, baseline=None, threshold=REGRESSION_THRESHOLD, views=True):
+    report = run_suite(sizes, repeat, views)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if not baseline:
+        return 0
+    with open(baseline, encoding="utf-8") as f:
+        regressions = compare_results(json.load(f), report, threshold)
+    for key, previous, current, unit, ratio in regressions:
+        print(f"[!] Регрессия {key}: {previous} -> {current} {unit} (x{ratio:.2f})", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def start_server(path, workers):
+    process = subprocess.Popen([sys.executable, "server.py", "--db", path, "--port", "0", "--workers", str(workers)],
+                               cwd=PROJECT_DIR, stdout=subprocess.PIPE, text=True)
+    for line in process.stdout:
+        match = re.search(r"http://[^:]+:(\d+)/", line)
+        if match:
+            # Дальнейший вывод сервера вычитываем, чтобы он не встал на переполненном канале.
+            threading.Thread(target=process.stdout.read, daemon=True).start()
+            return process, int(match.group(1))
+    raise RuntimeError("сервер не запустился")
+
+
+def server_client(port, recipes, deadline, write_ratio, seed, samples):
+    # Один клиент — одно keep-alive соединение; запросы идут подряд, без пауз.
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    etags = {}
+    kinds = [kind for kind, _ in SERVER_MIX]
+    weights = [weight for _, weight in SERVER_MIX]
+    while time.perf_counter() < deadline:
+        kind = "update" if rng.random() < write_ratio else rng.choices(kinds, weights)[0]
+        recipe_id = rng.randint(1, recipes)
+        if kind == "recipe_304" and etags:
+            # Повторный запрос уже полученного рецепта с его ETag.
+            recipe_id = rng.choice(list(etags))
+        headers = {}
+        body = None
+        method = "GET"
+        if kind in ("recipe", "recipe_304"):
+            url = f"/recipes/{recipe_id}"
+            if kind == "recipe_304" and recipe_id in etags:
+                headers["If-None-Match"] = etags[recipe_id]
+        elif kind == "update":
+            method = "PUT"
+            url = f"/recipes/{recipe_id}"
+            body = json.dumps({"instructions": f"Инструкция, изменённая клиентом {seed}."}).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        else:
+            names = [f"ингредиент {rng.randint(1, 100):05d}" for _ in range(1 if kind == "search" else 5)]
+            mode = "&mode=pantry" if kind == "pantry" else ""
+            url = "/recipes?q=" + urllib.parse.quote(", ".join(names)) + mode + "&limit=20"
+        start = time.perf_counter()
+        conn.request(method, url, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        elapsed = time.perf_counter() - start
+        if kind in ("recipe", "recipe_304") and response.getheader("ETag"):
+            etags[recipe_id] = response.getheader("ETag")
+        samples.append((kind, response.status, elapsed))
+    conn.close()
+
+
+def bench_server(recipes, clients=SERVER_CLIENTS, duration=SERVER_DURATION, write_ratio=SERVER_WRITE_RATIO,
+                 workers=None):
+    # Сервер — отдельный процесс на копии каталога; клиенты в этом процессе не делят с ним GIL.
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "recipes.db")
+        shutil.copy(ensure_catalog(recipes), path)
+        process, port = start_server(path, workers or max(clients, 1))
+        try:
+            samples = []
+            deadline = time.perf_counter() + duration
+            threads = [threading.Thread(target=server_client, args=(port, recipes, deadline, write_ratio, seed,
+                                                                    samples))
+                       for seed in range(clients)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            process.terminate()
+            process.wait()
+    print(f"{recipes} рецептов, {clients} клиентов, {elapsed:.1f} с: {len(samples) / elapsed:.0f} запросов/с")
+    by_kind = {}
+    for kind, status, seconds in samples:
+        by_kind.setdefault(kind, []).append((status, seconds * 1000))
+    for kind, items in sorted(by_kind.items()):
+        latencies = sorted(ms for _, ms in items)
+        statuses = ", ".join(f"{status}: {count}" for status, count in
+                             sorted(collections.Counter(status for status, _ in items).items()))
+        print(f"  {kind:<12} {len(items):>7}  p50 {percentile(latencies, 0.5):7.2f}  "
+              f"p95 {percentile(latencies, 0.95):7.2f}  p99 {percentile(latencies, 0.99):7.2f} мс  [{statuses}]")
+    return 0
+
+
+def import_profile(module="recipe"):
+    # Разбираем вывод -X importtime: «self | cumulative | модуль», вложенность — отступом.
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=PROJECT_DIR,
+                            env=dict(os.environ, QT_QPA_PLATFORM="offscreen"), capture_output=True, text=True)
+    modules = []
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "):
+            total += int(cumulative_us)
+        modules.append((int(self_us), int(cumulative_us), name.strip()))
+    return total, modules
+
+
+def bench_startup(repeat, top=15):
+    total, modules = import_profile()
+    print(f"import recipe: {total / 1000:.1f} мс (бюджет {IMPORT_BUDGET_MS} мс)")
+    for self_us, cumulative_us, name in sorted(modules, reverse=True)[:top]:
+        print(f"  {name:<40} self {self_us / 1000:7.1f} мс  всего {cumulative_us / 1000:7.1f} мс")
+    if any(name == "tts" or name == "pyttsx3" for _, _, name in modules):
+        print("[!] Модуль озвучки импортируется при старте")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "recipes.db")
+        shutil.copy(os.path.join(PROJECT_DIR, "recipes.db"), db_path)
+        runs = []
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, db_path], cwd=PROJECT_DIR,
+                                    capture_output=True, text=True).stdout.split()
+            runs.append([float(value) for value in output[-3:]])
+    imported, window, listed = (min(column) for column in zip(*runs))
+    print(f"старт (лучший из {repeat}): импорт {imported:.1f} мс, окно {window:.1f} мс, "
+          f"список рецептов {listed:.1f} мс (бюджет {STARTUP_BUDGET_MS} мс)")
+    over = total / 1000 > IMPORT_BUDGET_MS or listed > STARTUP_BUDGET_MS
+    print("[!] Бюджет старта превышен" if over else "Бюджет старта соблюдён")
+    return 1 if over else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки database.py на синтетических каталогах")
+    parser.add_argument("command", choices=["index", "startup", "suite", "server"])
+    parser.add_argument("--recipes", type=int, nargs="+", help=f"размеры каталогов (suite: {SUITE_SIZES})")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="suite: куда записать JSON (по умолчанию stdout)")
+    parser.add_argument("--compare", help="suite: JSON прошлого прогона для поиска регрессий")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="suite: допустимое ухудшение, доля (0.25 = 25%%)")
+    parser.add_argument("--no-views", action="store_true", help="suite: без замеров Qt-окна")
+    parser.add_argument("--clients", type=int, default=SERVER_CLIENTS, help="server: параллельных клиентов")
+    parser.add_argument("--duration", type=float, default=SERVER_DURATION, help="server: длительность, с")
+    parser.add_argument("--write-ratio", type=float, default=SERVER_WRITE_RATIO, help="server: доля записей")
+    parser.add_argument("--workers", type=int, help="server: потоков сервера (по умолчанию по числу клиентов)")
+    args = parser.parse_args()
+    if args.command == "startup":
+        return bench_startup(args.repeat)
+    if args.command == "suite":
+        return bench_suite(args.recipes or SUITE_SIZES, args.repeat, args.output, args.compare, args.threshold,
+                           not args.no_views)
+    if args.command == "server":
+        for recipes in args.recipes or [100000]:
+            bench_server(recipes, args.clients, args.duration, args.write_ratio, args.workers)
+        return 0
+    for recipes in args.recipes or [100000, 1000000]:
+        if args.command == "index":
+            bench_index(recipes, args.repeat)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
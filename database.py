@@ -2,6 +2,16 @@ import sqlite3
 import os
 import sys
 import shutil
+import threading
+import atexit
+import json
+import re
+import pathlib
+from recipe_index import RecipeIndex
+from ingredient_dict import IngredientDictionary, normalize_name
+from recipe_cache import RecipeCache
+from pantry_index import PantryMatrix, PANTRY_LIMIT, load_numpy, top_by_coverage
+import instrumentation
 
 
 def resource_path(relative_path):
@@ -27,7 +37,7 @@ def ensure_db_and_resources():
         else:
             print(f"[!] recipes.db не найдена в ресурсах: {src_db}")
 
-    if not os.path.exists(resources_dir):
+    if not os.path.exists(resources_dir) and not stores_images_in_db(db_path):
         print(f"[!] Папка resources не найдена в {exe_dir}, копируем из ресурсов...")
         src_resources = resource_path("resources")
         if os.path.exists(src_resources):
@@ -36,34 +46,274 @@ def ensure_db_and_resources():
         else:
             print(f"[!] Папка resources не найдена в ресурсах: {src_resources}")
 
-    update_image_paths_in_db(resources_dir, exe_dir)
 
+def stores_images_in_db(db_path):
+    # Картинки уже в базе — копия resources рядом с ней не нужна.
+    if not os.path.exists(db_path):
+        return False
+    try:
+        conn = sqlite3.connect(pathlib.Path(os.path.abspath(db_path)).as_uri() + "?mode=ro", uri=True)
+        try:
+            row = conn.execute("SELECT value FROM app_meta WHERE key = 'image_storage'").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+    return bool(row) and row[0] == IMAGE_STORAGE_DB
+
+
+def data_root():
+    return os.path.dirname(os.path.abspath(DB_PATH))
+
+
+def is_absolute_path(path):
+    # Пути вида C:/... считаем абсолютными и на других системах: база переносится между ними.
+    return os.path.isabs(path) or bool(re.match(r"^[A-Za-z]:[\\/]", path))
+
+
+def resolve_data_path(path):
+    if path and not is_absolute_path(path) and not is_blob_key(path):
+        return os.path.join(data_root(), path)
+    return path
+
+
+def relative_image_path(path, root):
+    # Абсолютный путь внутри папки данных или к файлу из resources превращаем в относительный.
+    if not path or not is_absolute_path(path):
+        return path
+    normalized = path.replace('\\', '/')
+    root_prefix = root.replace('\\', '/').rstrip('/') + '/'
+    if normalized.startswith(root_prefix):
+        return normalized[len(root_prefix):]
+    marker = normalized.rfind('/resources/')
+    if marker != -1:
+        candidate = normalized[marker + 1:]
+        if os.path.exists(os.path.join(root, candidate)):
+            return candidate
+    return path
+
+
+def relocate_image_paths(conn=None):
+    # Переписываем пути один раз на каждую папку установки и версию схемы; дальше — O(1) проверка.
+    conn = conn or get_connection()
+    root = data_root()
+    marker = f"{root}|{SCHEMA_VERSION}"
+    row = conn.execute("SELECT value FROM app_meta WHERE key = 'image_paths_relocated'").fetchone()
+    if row and row[0] == marker:
+        return 0
+    updates = []
+    for recipe_id, old_path in conn.execute("SELECT id, image_path FROM recipes WHERE image_path IS NOT NULL"):
+        new_path = relative_image_path(old_path, root)
+        if new_path != old_path:
+            updates.append((new_path, recipe_id))
+    with conn:
+        conn.executemany("UPDATE recipes SET image_path = ? WHERE id = ?", updates)
+        conn.execute("INSERT OR REPLACE INTO app_meta (key, value) VALUES ('image_paths_relocated', ?)", (marker,))
+    if updates:
+        _recipes_changed([recipe_id for _, recipe_id in updates])
+        print(f"[!] Пути к изображениям переведены в относительные: {len(updates)}")
+    return len(updates)
 
-def update_image_paths_in_db(resources_dir, exe_dir):
-    conn = sqlite3.connect(os.path.join(exe_dir, "recipes.db"))
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, image_path FROM recipes WHERE image_path IS NOT NULL")
-    rows = cursor.fetchall()
-
-    for recipe_id, old_path in rows:
-        if old_path.startswith("resources/"):
-            new_path = os.path.join(exe_dir, old_path.replace("resources/", "", 1)).replace('\\', '/')
-            if os.path.exists(new_path):
-                cursor.execute("UPDATE recipes SET image_path = ? WHERE id = ?", (new_path, recipe_id))
-                print(f"[!] Обновлён путь для рецепта {recipe_id}: {old_path} -> {new_path}")
-            else:
-                print(f"[!] Файл изображения не найден по новому пути: {new_path}")
-        elif not os.path.isabs(old_path):
-            assumed_path = os.path.join(resources_dir, os.path.basename(old_path))
-            if os.path.exists(assumed_path):
-                cursor.execute("UPDATE recipes SET image_path = ? WHERE id = ?", (assumed_path, recipe_id))
-                print(f"[!] Обновлён путь для рецепта {recipe_id}: {old_path} -> {assumed_path}")
-    conn.commit()
-    conn.close()
 
 DB_PATH = os.path.join(os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__)), "recipes.db")
 INGREDIENTS_FILE = os.path.join(os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__)), "resources", "ingredients.txt")
 RECIPES_FILE = os.path.join(os.path.dirname(sys.executable) if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__)), "resources", "prescription.txt")
+IMAGE_STORE_PREFIX = "images/"
+DEFAULT_IMAGE = "resources/def.png"
+IMAGE_BLOB_PREFIX = "db:"
+IMAGE_STORAGE_FILES = "files"
+IMAGE_STORAGE_DB = "db"
+BLOB_CHUNK_SIZE = 64 * 1024
+
+CONNECTION_PRAGMAS = (
+    # Для новой базы действует, только если задан до включения WAL; для старой — при следующем VACUUM.
+    "PRAGMA auto_vacuum = INCREMENTAL",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",
+)
+STATEMENT_CACHE_SIZE = 256
+
+_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+
+
+def open_connection(path=None):
+    conn = sqlite3.connect(path or DB_PATH, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False,
+                           factory=instrumentation.connection_factory())
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def get_connection():
+    # Одно долгоживущее соединение на поток; при смене DB_PATH переоткрываем.
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.path == DB_PATH:
+        return conn
+    if conn is not None:
+        close_connection()
+    conn = open_connection()
+    _local.conn = conn
+    _local.path = DB_PATH
+    with _connections_lock:
+        _connections.append(conn)
+    return conn
+
+
+def close_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        return
+    with _connections_lock:
+        if conn in _connections:
+            _connections.remove(conn)
+    conn.close()
+    _local.conn = None
+    _local.path = None
+
+
+def close_all_connections():
+    with _connections_lock:
+        connections = list(_connections)
+        _connections.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    _local.conn = None
+    _local.path = None
+
+
+atexit.register(close_all_connections)
+
+
+def _migration_link_table_keys(conn):
+    conn.execute("""
+    CREATE TABLE recipe_ingredients_new (
+        recipe_id INTEGER NOT NULL,
+        ingredient_id INTEGER NOT NULL,
+        PRIMARY KEY (recipe_id, ingredient_id),
+        FOREIGN KEY(recipe_id) REFERENCES recipes(id) ON DELETE CASCADE,
+        FOREIGN KEY(ingredient_id) REFERENCES ingredients(id) ON DELETE CASCADE
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    INSERT OR IGNORE INTO recipe_ingredients_new (recipe_id, ingredient_id)
+    SELECT recipe_id, ingredient_id FROM recipe_ingredients
+    WHERE recipe_id IN (SELECT id FROM recipes) AND ingredient_id IN (SELECT id FROM ingredients)
+    """)
+    conn.execute("DROP TABLE recipe_ingredients")
+    conn.execute("ALTER TABLE recipe_ingredients_new RENAME TO recipe_ingredients")
+    conn.execute("CREATE INDEX idx_recipe_ingredients_ingredient ON recipe_ingredients (ingredient_id, recipe_id)")
+
+
+def _migration_recipes_fts(conn):
+    # FTS5 читает текст через представление, где «ё» заменена на «е».
+    conn.execute("""
+    CREATE VIEW recipes_fts_source AS
+    SELECT id,
+           replace(replace(name, 'ё', 'е'), 'Ё', 'Е') AS name,
+           replace(replace(instructions, 'ё', 'е'), 'Ё', 'Е') AS instructions
+    FROM recipes
+    """)
+    conn.execute("""
+    CREATE VIRTUAL TABLE recipes_fts USING fts5(
+        name, instructions,
+        content='recipes_fts_source', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """)
+    conn.execute("""
+    CREATE TRIGGER recipes_fts_insert AFTER INSERT ON recipes BEGIN
+        INSERT INTO recipes_fts (rowid, name, instructions)
+        SELECT id, name, instructions FROM recipes_fts_source WHERE id = new.id;
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER recipes_fts_delete AFTER DELETE ON recipes BEGIN
+        INSERT INTO recipes_fts (recipes_fts, rowid, name, instructions)
+        VALUES ('delete', old.id,
+                replace(replace(old.name, 'ё', 'е'), 'Ё', 'Е'),
+                replace(replace(old.instructions, 'ё', 'е'), 'Ё', 'Е'));
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER recipes_fts_update AFTER UPDATE OF name, instructions ON recipes BEGIN
+        INSERT INTO recipes_fts (recipes_fts, rowid, name, instructions)
+        VALUES ('delete', old.id,
+                replace(replace(old.name, 'ё', 'е'), 'Ё', 'Е'),
+                replace(replace(old.instructions, 'ё', 'е'), 'Ё', 'Е'));
+        INSERT INTO recipes_fts (rowid, name, instructions)
+        SELECT id, name, instructions FROM recipes_fts_source WHERE id = new.id;
+    END
+    """)
+    conn.execute("INSERT INTO recipes_fts (recipes_fts) VALUES ('rebuild')")
+
+
+def _migration_app_meta(conn):
+    conn.execute("""
+    CREATE TABLE app_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    ) WITHOUT ROWID
+    """)
+
+
+def _migration_recipe_images(conn):
+    # Картинки лежат отдельно от recipes: строки рецептов остаются короткими, а просмотр списка — быстрым.
+    # Миниатюра и полный размер — разные строки, чтобы чтение миниатюры не проходило страницы большой картинки.
+    conn.execute("""
+    CREATE TABLE recipe_images (
+        id INTEGER PRIMARY KEY,
+        digest TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        format TEXT NOT NULL,
+        width INTEGER NOT NULL,
+        height INTEGER NOT NULL,
+        data BLOB NOT NULL,
+        UNIQUE (digest, kind)
+    )
+    """)
+
+
+MIGRATIONS = (
+    _migration_link_table_keys,
+    _migration_recipes_fts,
+    _migration_app_meta,
+    _migration_recipe_images,
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn=None):
+    conn = conn or get_connection()
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate_db(conn=None):
+    conn = conn or get_connection()
+    version = get_schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        return version
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            MIGRATIONS[target - 1](conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"[!] Схема базы данных обновлена до версии {target}")
+    conn.execute("ANALYZE")
+    conn.commit()
+    return SCHEMA_VERSION
 
 
 def load_ingredients_from_file():
@@ -75,44 +325,76 @@ def load_ingredients_from_file():
     return ingredients
 
 
+BLOCK_EMPTY_FIELD = "-"
+BLOCK_ESCAPE = "\\"
+
+
+def escape_block_line(line):
+    # Пустая строка разделяет блоки, а строка «-» означает пустое поле: такие строки (и начатые с «\») экранируем.
+    if line.strip() in ('', BLOCK_EMPTY_FIELD) or line.startswith(BLOCK_ESCAPE):
+        return BLOCK_ESCAPE + line
+    return line
+
+
+def format_block_field(text):
+    lines = text.splitlines() if text else []
+    if not lines:
+        return BLOCK_EMPTY_FIELD
+    return '\n'.join(escape_block_line(line) for line in lines)
+
+
+def parse_block_field(lines):
+    if len(lines) == 1 and lines[0].strip() == BLOCK_EMPTY_FIELD:
+        return ""
+    return '\n'.join(line[1:] if line.startswith(BLOCK_ESCAPE) else line for line in lines).strip()
+
+
+def parse_recipe_block(lines):
+    if len(lines) < 4:
+        print(f"Некорректный формат рецепта: {' '.join(lines)[:50]}...")
+        return None
+    name = parse_block_field(lines[:1])
+    ingredients_str = parse_block_field(lines[1:2])
+    instructions = parse_block_field(lines[2:-1])
+    image_path = parse_block_field(lines[-1:])
+    ingredients_list = [ing.strip() for ing in ingredients_str.split(',') if ing.strip()]
+    return {
+        'name': name,
+        'instructions': instructions,
+        'image_path': image_path,
+        'ingredients': ingredients_list
+    }
+
+
+def iter_recipe_blocks(lines):
+    # Блоки рецептов разделены пустой строкой; файл читается построчно.
+    block = []
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line.strip():
+            block.append(line)
+            continue
+        if block:
+            recipe = parse_recipe_block(block)
+            if recipe:
+                yield recipe
+            block = []
+    if block:
+        recipe = parse_recipe_block(block)
+        if recipe:
+            yield recipe
+
+
 def load_recipes_from_file():
     if not os.path.exists(RECIPES_FILE):
         print(f"Файл {RECIPES_FILE} не найден.")
         return []
     with open(RECIPES_FILE, "r", encoding="utf-8") as f:
-        content = f.read().strip()
-    raw_recipes = [block.strip() for block in content.split('\n\n') if block.strip()]
-
-    recipes = []
-    for block in raw_recipes:
-        lines = block.split('\n')
-        if len(lines) < 4:
-            print(f"Некорректный формат рецепта: {block[:50]}...")
-            continue
-        name = lines[0].strip()
-        ingredients_str = lines[1].strip()
-        instructions = '\n'.join(lines[2:-1]).strip()
-        image_path = lines[-1].strip()
-        ingredients_list = [ing.strip() for ing in ingredients_str.split(',')]
-        recipes.append({
-            'name': name,
-            'instructions': instructions,
-            'image_path': image_path,
-            'ingredients': ingredients_list
-        })
-    return recipes
+        return list(iter_recipe_blocks(f))
 
 
-def init_db():
-    ensure_db_and_resources() 
-    
-    if os.path.exists(DB_PATH):
-        print(f"База данных {DB_PATH} существует")
-        return
-    print(f"{DB_PATH} создана")
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
+def create_base_schema(conn):
+    conn.execute("""
     CREATE TABLE recipes (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         name TEXT NOT NULL,
@@ -120,13 +402,13 @@ def init_db():
         image_path TEXT
     )
     """)
-    cursor.execute("""
+    conn.execute("""
     CREATE TABLE ingredients (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         name TEXT UNIQUE NOT NULL
     )
     """)
-    cursor.execute("""
+    conn.execute("""
     CREATE TABLE recipe_ingredients (
         recipe_id INTEGER,
         ingredient_id INTEGER,
@@ -135,17 +417,32 @@ def init_db():
     )
     """)
 
+
+def init_db():
+    ensure_db_and_resources() 
+    
+    if os.path.exists(DB_PATH):
+        print(f"База данных {DB_PATH} существует")
+        migrate_db()
+        relocate_image_paths()
+        return
+    print(f"{DB_PATH} создана")
+    conn = get_connection()
+    cursor = conn.cursor()
+    create_base_schema(conn)
+
     initial_ingredients = load_ingredients_from_file()
     if not initial_ingredients:
         print(f"[!] Не удалось загрузить ингредиенты из {INGREDIENTS_FILE}. База данных не будет заполнена.")
-        conn.close()
+        migrate_db()
         return
 
     cursor.executemany("INSERT OR IGNORE INTO ingredients (name) VALUES (?)", [(name,) for name in initial_ingredients])
     initial_recipes_data = load_recipes_from_file()
     if not initial_recipes_data:
         print(f"[!] Не удалось загрузить рецепты из {RECIPES_FILE}. База данных не будет заполнена.")
-        conn.close()
+        conn.rollback()
+        migrate_db()
         return
     cursor.execute("SELECT id, name FROM ingredients")
     ing_map = {name: id for id, name in cursor.fetchall()}
@@ -154,121 +451,797 @@ def init_db():
         name = recipe_data['name']
         instructions = recipe_data['instructions']
         image_path = recipe_data['image_path']
-        if image_path.startswith("resources/"):
-            exe_dir = os.path.dirname(DB_PATH)
-            image_path = os.path.join(exe_dir, image_path.replace("resources/", "", 1)).replace('\\', '/')
         cursor.execute("INSERT INTO recipes (name, instructions, image_path) VALUES (?, ?, ?)", (name, instructions, image_path))
         recipe_id = cursor.lastrowid
         for ing_name in recipe_data['ingredients']:
             if ing_name in ing_map:
                 cursor.execute(
-                    "INSERT INTO recipe_ingredients (recipe_id, ingredient_id) VALUES (?, ?)",
+                    "INSERT OR IGNORE INTO recipe_ingredients (recipe_id, ingredient_id) VALUES (?, ?)",
                     (recipe_id, ing_map[ing_name])
                 )
             else:
                 print(f"[!] Ингредиент '{ing_name}' из рецепта '{name}' не найден в списке ингредиентов.")
     conn.commit()
-    conn.close()
+    migrate_db()
+    relocate_image_paths()
     print(f"[!] База данных {DB_PATH} создана и заполнена начальными данными из файлов.")
 
 
 def get_all_ingredients():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name FROM ingredients ORDER BY name")
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    conn = get_connection()
+    return conn.execute("SELECT id, name FROM ingredients ORDER BY name").fetchall()
+
+
+_ingredient_dictionary = None
+_ingredient_dictionary_lock = threading.Lock()
+
+
+def get_ingredient_dictionary():
+    global _ingredient_dictionary
+    with _ingredient_dictionary_lock:
+        if _ingredient_dictionary is None:
+            _ingredient_dictionary = IngredientDictionary(get_all_ingredients())
+        return _ingredient_dictionary
+
+
+def cached_ingredient_dictionary():
+    # Уже построенный справочник или None: GUI-поток не должен строить его сам.
+    return _ingredient_dictionary
+
+
+def reset_ingredient_dictionary():
+    global _ingredient_dictionary
+    with _ingredient_dictionary_lock:
+        _ingredient_dictionary = None
+
+
+_recipe_index = None
+
+
+def enable_recipe_index():
+    global _recipe_index
+    conn = get_connection()
+    recipe_ids = [row[0] for row in conn.execute("SELECT id FROM recipes")]
+    links = conn.execute("SELECT recipe_id, ingredient_id FROM recipe_ingredients ORDER BY ingredient_id")
+    _recipe_index = RecipeIndex.build(recipe_ids, links)
+    return _recipe_index
+
+
+def disable_recipe_index():
+    global _recipe_index
+    _recipe_index = None
+
+
+def get_recipe_index():
+    return _recipe_index
+
+
+def _indexed_ingredients(recipe_id):
+    # Прежний состав рецепта из индекса (None, если индекс выключен) — до обновления самого индекса.
+    if _recipe_index is None or recipe_id not in _recipe_index:
+        return None
+    return _recipe_index.ingredients_of(recipe_id)
+
+
+_pantry_matrix = None
+_pantry_matrix_lock = threading.Lock()
+
+
+def get_pantry_matrix():
+    # Строится при первом ранжированном поиске; None, если numpy не установлен.
+    global _pantry_matrix
+    with _pantry_matrix_lock:
+        if _pantry_matrix is None:
+            np = load_numpy()
+            if np is None:
+                return None
+            columns = get_connection().execute(
+                "SELECT ingredient_id, GROUP_CONCAT(recipe_id) FROM recipe_ingredients GROUP BY ingredient_id")
+            _pantry_matrix = PantryMatrix.build(np, columns)
+        return _pantry_matrix
+
+
+def disable_pantry_matrix():
+    global _pantry_matrix
+    with _pantry_matrix_lock:
+        _pantry_matrix = None
+
+
+def rank_recipes_by_pantry(ingredient_ids, limit=PANTRY_LIMIT):
+    # «Что приготовить»: рецепты по доле имеющихся ингредиентов, [(recipe_id, matched, missing, score)].
+    ingredient_ids = sorted(set(ingredient_ids))
+    if not ingredient_ids:
+        return []
+    matrix = get_pantry_matrix()
+    if matrix is not None:
+        return matrix.rank(ingredient_ids, limit)
+    rows = get_connection().execute("""
+    SELECT ri.recipe_id, COUNT(*),
+           (SELECT COUNT(*) FROM recipe_ingredients x WHERE x.recipe_id = ri.recipe_id)
+    FROM recipe_ingredients ri
+    WHERE ri.ingredient_id IN (SELECT value FROM json_each(?))
+    GROUP BY ri.recipe_id
+    """, (json.dumps(ingredient_ids),))
+    return top_by_coverage(rows, len(ingredient_ids), limit)
+
+
+_recipe_cache = None
+_recipe_cache_path = None
+_recipe_cache_lock = threading.Lock()
+
+
+def get_recipe_cache():
+    # Кэш привязан к файлу базы: при смене DB_PATH начинаем с пустого.
+    global _recipe_cache, _recipe_cache_path
+    with _recipe_cache_lock:
+        if _recipe_cache is None or _recipe_cache_path != DB_PATH:
+            _recipe_cache = RecipeCache()
+            _recipe_cache_path = DB_PATH
+        return _recipe_cache
+
+
+def reset_recipe_cache():
+    global _recipe_cache
+    with _recipe_cache_lock:
+        _recipe_cache = None
+
+
+def get_recipe_cache_stats():
+    return get_recipe_cache().stats()
+
+
+_data_version = 0
+
+
+def data_version():
+    # Растёт при каждой записи рецептов: по нему сбрасываются кэши результатов поиска.
+    return _data_version
+
+
+RECIPE_INSERTED = "inserted"
+RECIPE_UPDATED = "updated"
+RECIPE_DELETED = "deleted"
+RECIPES_RESET = "reset"
+
+_change_listeners = []
+
+
+def add_change_listener(listener):
+    # listener(kind, recipe_ids) вызывается после каждой записи рецептов, в потоке, который её сделал.
+    # RECIPES_RESET — изменений много или они неизвестны (импорт, запись другим процессом): список стоит перечитать.
+    _change_listeners.append(listener)
+
+
+def remove_change_listener(listener):
+    if listener in _change_listeners:
+        _change_listeners.remove(listener)
+
+
+def _recipes_changed(recipe_ids, kind=RECIPE_UPDATED):
+    global _data_version
+    get_recipe_cache().invalidate(recipe_ids)
+    _data_version += 1
+    recipe_ids = list(recipe_ids)
+    for listener in list(_change_listeners):
+        listener(kind if recipe_ids else RECIPES_RESET, recipe_ids)
+
+
+def get_meta(key, default=None):
+    row = get_connection().execute("SELECT value FROM app_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def set_meta(key, value):
+    conn = get_connection()
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO app_meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def image_storage_mode():
+    return get_meta("image_storage", IMAGE_STORAGE_FILES)
+
+
+def set_image_storage_mode(mode):
+    set_meta("image_storage", mode)
+
+
+def default_image_key():
+    # Ключ картинки по умолчанию в recipe_images; записывается при переносе картинок в базу.
+    return get_meta("default_image")
+
+
+def set_default_image_key(key):
+    set_meta("default_image", key)
+
+
+def is_blob_key(path):
+    return bool(path) and path.startswith(IMAGE_BLOB_PREFIX)
+
+
+def image_blob_key(digest):
+    return f"{IMAGE_BLOB_PREFIX}{digest}"
+
+
+def has_image_blob(digest):
+    return get_connection().execute(
+        "SELECT 1 FROM recipe_images WHERE digest = ? AND kind = 'full'", (digest,)).fetchone() is not None
+
+
+def write_image_blobs(digest, variants):
+    # variants: (kind, format, width, height, data); data пишется кусками из буфера без копии целиком.
+    conn = get_connection()
+    with conn:
+        for kind, fmt, width, height, data in variants:
+            view = memoryview(data)
+            cursor = conn.execute(
+                "INSERT OR REPLACE INTO recipe_images (digest, kind, format, width, height, data) "
+                "VALUES (?, ?, ?, ?, ?, zeroblob(?))",
+                (digest, kind, fmt, width, height, view.nbytes))
+            with conn.blobopen("recipe_images", "data", cursor.lastrowid) as blob:
+                for offset in range(0, view.nbytes, BLOB_CHUNK_SIZE):
+                    blob.write(view[offset:offset + BLOB_CHUNK_SIZE])
+    return image_blob_key(digest)
+
+
+def read_image_blob(key, kind="full"):
+    # Читает картинку кусками в заранее выделенный буфер; нет нужного размера — отдаёт полный.
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT id FROM recipe_images WHERE digest = ? AND kind IN (?, 'full') ORDER BY kind = ? DESC LIMIT 1",
+        (key[len(IMAGE_BLOB_PREFIX):], kind, kind)).fetchone()
+    if row is None:
+        return None
+    try:
+        with conn.blobopen("recipe_images", "data", row[0], readonly=True) as blob:
+            data = bytearray(len(blob))
+            view = memoryview(data)
+            offset = 0
+            while offset < len(data):
+                chunk = blob.read(BLOB_CHUNK_SIZE)
+                if not chunk:
+                    break
+                view[offset:offset + len(chunk)] = chunk
+                offset += len(chunk)
+    except sqlite3.Error:
+        # Картинку успели заменить или удалить между запросом и открытием.
+        return None
+    return view
+
+
+def replace_image_paths(mapping):
+    # mapping: старый image_path -> новый; возвращает число изменённых рецептов.
+    conn = get_connection()
+    recipe_ids = []
+    with conn:
+        for old_path, new_path in mapping.items():
+            recipe_ids += [row[0] for row in conn.execute("SELECT id FROM recipes WHERE image_path = ?", (old_path,))]
+            conn.execute("UPDATE recipes SET image_path = ? WHERE image_path = ?", (new_path, old_path))
+    if recipe_ids:
+        _recipes_changed(recipe_ids)
+    return len(recipe_ids)
+
+
+def check_external_changes():
+    # PRAGMA data_version меняют только коммиты других соединений, поэтому вызывать нужно из потока,
+    # через который идут все записи процесса: тогда изменение означает запись другим процессом.
+    conn = get_connection()
+    version = conn.execute("PRAGMA data_version").fetchone()[0]
+    seen = getattr(_local, "data_version", None)
+    _local.data_version = (conn, version)
+    if seen is None or seen[0] is not conn or seen[1] == version:
+        return False
+    reset_ingredient_dictionary()
+    get_recipe_cache().clear()
+    if _recipe_index is not None:
+        enable_recipe_index()
+    disable_pantry_matrix()
+    _recipes_changed(())
+    print("[!] База изменена другим процессом, кэши сброшены")
+    return True
+
+
+def get_recipes_by_ids(recipe_ids):
+    conn = get_connection()
+    return conn.execute(
+        "SELECT id, name, instructions, image_path FROM recipes "
+        "WHERE id IN (SELECT value FROM json_each(?)) ORDER BY id",
+        (json.dumps(list(recipe_ids)),)
+    ).fetchall()
+
+
+def get_recipe_ingredient_ids(recipe_ids):
+    # recipe_id -> set(ingredient_id) для существующих рецептов, включая рецепты без ингредиентов.
+    result = {}
+    for recipe_id, ingredient_id in get_connection().execute("""
+            SELECT r.id, ri.ingredient_id FROM recipes r
+            LEFT JOIN recipe_ingredients ri ON ri.recipe_id = r.id
+            WHERE r.id IN (SELECT value FROM json_each(?))
+            """, (json.dumps(list(recipe_ids)),)):
+        ingredients = result.setdefault(recipe_id, set())
+        if ingredient_id is not None:
+            ingredients.add(ingredient_id)
+    return result
+
+
+def get_recipe_names(recipe_ids):
+    conn = get_connection()
+    return dict(conn.execute(
+        "SELECT id, name FROM recipes WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(list(recipe_ids)),)
+    ))
+
+
+def get_recipe_ids_by_ingredients(ingredient_ids):
+    if _recipe_index is not None:
+        return _recipe_index.all_of(ingredient_ids)
+    conn = get_connection()
+    if not ingredient_ids:
+        return [row[0] for row in conn.execute("SELECT id FROM recipes ORDER BY id")]
+    ingredient_ids = sorted(set(ingredient_ids))
+    placeholders = ','.join('?' * len(ingredient_ids))
+    query = f"""
+    SELECT recipe_id FROM recipe_ingredients
+    WHERE ingredient_id IN ({placeholders})
+    GROUP BY recipe_id
+    HAVING COUNT(*) = ?
+    ORDER BY recipe_id
+    """
+    return [row[0] for row in conn.execute(query, ingredient_ids + [len(ingredient_ids)])]
 
 
 def get_recipes_by_ingredients(ingredient_ids):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    if _recipe_index is not None:
+        return get_recipes_by_ids(_recipe_index.all_of(ingredient_ids))
+
+    conn = get_connection()
 
     if not ingredient_ids:
-        cursor.execute("SELECT id, name, instructions, image_path FROM recipes")
-    else:
+        return conn.execute("SELECT id, name, instructions, image_path FROM recipes ORDER BY id").fetchall()
+
+    ingredient_ids = sorted(set(ingredient_ids))
+    placeholders = ','.join('?' * len(ingredient_ids))
+    query = f"""
+    SELECT r.id, r.name, r.instructions, r.image_path
+    FROM recipes r
+    JOIN recipe_ingredients ri ON r.id = ri.recipe_id
+    WHERE ri.ingredient_id IN ({placeholders})
+    GROUP BY r.id
+    HAVING COUNT(*) = ?
+    ORDER BY r.id
+    """
+    return conn.execute(query, ingredient_ids + [len(ingredient_ids)]).fetchall()
+
+
+FTS_NAME_WEIGHT = 10.0
+FTS_INSTRUCTIONS_WEIGHT = 1.0
+
+
+def build_fts_query(text):
+    words = re.findall(r"\w+", text.lower().replace("ё", "е"))
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_recipes_text(text, ingredient_ids=None, limit=50, offset=0):
+    match = build_fts_query(text)
+    if not match:
+        return []
+    params = [match]
+    ingredient_filter = ""
+    if ingredient_ids:
+        ingredient_ids = sorted(set(ingredient_ids))
         placeholders = ','.join('?' * len(ingredient_ids))
-        query = f"""
-        SELECT r.id, r.name, r.instructions, r.image_path
+        ingredient_filter = f"""
+        AND r.id IN (
+            SELECT recipe_id FROM recipe_ingredients
+            WHERE ingredient_id IN ({placeholders})
+            GROUP BY recipe_id
+            HAVING COUNT(*) = ?
+        )"""
+        params += ingredient_ids + [len(ingredient_ids)]
+    query = f"""
+    SELECT r.id, r.name, r.instructions, r.image_path
+    FROM recipes_fts
+    JOIN recipes r ON r.id = recipes_fts.rowid
+    WHERE recipes_fts MATCH ?{ingredient_filter}
+    ORDER BY bm25(recipes_fts, ?, ?), r.id
+    LIMIT ? OFFSET ?
+    """
+    params += [FTS_NAME_WEIGHT, FTS_INSTRUCTIONS_WEIGHT, limit, offset]
+    return get_connection().execute(query, params).fetchall()
+
+
+def filter_recipes_text(text, recipe_ids):
+    # Те из recipe_ids, что нашёл бы search_recipes_text по тому же тексту.
+    match = build_fts_query(text)
+    if not match:
+        return []
+    rows = get_connection().execute(
+        "SELECT rowid FROM recipes_fts WHERE recipes_fts MATCH ? AND rowid IN (SELECT value FROM json_each(?))",
+        (match, json.dumps(list(recipe_ids))))
+    found = {row[0] for row in rows}
+    return [recipe_id for recipe_id in recipe_ids if recipe_id in found]
+
+
+BULK_CHUNK_SIZE = 5000
+
+
+def _chunked(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def bulk_add_recipes(recipes, chunk_size=BULK_CHUNK_SIZE, progress=None):
+    conn = get_connection()
+    total = 0
+    for chunk in _chunked(recipes, chunk_size):
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            resolved, inserted = _resolve_ingredients(conn, [name for recipe in chunk for name in recipe['ingredients']])
+            start_id = conn.execute("""
+                SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'recipes'), 0),
+                           COALESCE((SELECT MAX(id) FROM recipes), 0))
+            """).fetchone()[0] + 1
+            recipe_rows = []
+            link_rows = []
+            for recipe_id, recipe in enumerate(chunk, start=start_id):
+                recipe_rows.append((recipe_id, recipe['name'], recipe['instructions'], recipe['image_path']))
+                link_rows.extend((recipe_id, ing_id) for ing_id in _ids_for_names(resolved, recipe['ingredients']))
+            # Построчный FTS-триггер на порядок медленнее одной пакетной вставки,
+            # поэтому на время транзакции он снимается и восстанавливается.
+            fts_trigger = conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'recipes_fts_insert'"
+            ).fetchone()
+            if fts_trigger:
+                conn.execute("DROP TRIGGER recipes_fts_insert")
+            conn.executemany("INSERT INTO recipes (id, name, instructions, image_path) VALUES (?, ?, ?, ?)", recipe_rows)
+            conn.executemany("INSERT OR IGNORE INTO recipe_ingredients (recipe_id, ingredient_id) VALUES (?, ?)", link_rows)
+            if fts_trigger:
+                conn.execute(
+                    "INSERT INTO recipes_fts (rowid, name, instructions) "
+                    "SELECT id, name, instructions FROM recipes_fts_source WHERE id BETWEEN ? AND ?",
+                    (start_id, start_id + len(chunk) - 1)
+                )
+                conn.execute(fts_trigger[0])
+        _remember_ingredients(inserted)
+        total += len(chunk)
+        if progress:
+            progress(total)
+    if total and _recipe_index is not None:
+        enable_recipe_index()
+    if total and _pantry_matrix is not None:
+        disable_pantry_matrix()
+    if total:
+        _recipes_changed(())
+    return total
+
+
+def iter_recipes_for_export():
+    conn = get_connection()
+    cursor = conn.execute("""
+        SELECT r.id, r.name, r.instructions, r.image_path,
+               (SELECT json_group_array(i.name) FROM recipe_ingredients ri
+                JOIN ingredients i ON i.id = ri.ingredient_id
+                WHERE ri.recipe_id = r.id)
         FROM recipes r
-        JOIN recipe_ingredients ri ON r.id = ri.recipe_id
-        WHERE ri.ingredient_id IN ({placeholders})
-        GROUP BY r.id
-        HAVING COUNT(DISTINCT ri.ingredient_id) = ?
-        """
-        cursor.execute(query, ingredient_ids + [len(ingredient_ids)])
-
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+        ORDER BY r.id
+    """)
+    for recipe_id, name, instructions, image_path, ingredients in cursor:
+        yield {
+            'id': recipe_id,
+            'name': name,
+            'instructions': instructions or "",
+            'image_path': image_path or "",
+            'ingredients': json.loads(ingredients)
+        }
 
 
-def add_recipe(name, instructions, image_path, ingredient_ids):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO recipes (name, instructions, image_path) VALUES (?, ?, ?)", (name, instructions, image_path))
+def clean_ingredient_name(name):
+    return " ".join(name.lower().split())
+
+
+def _resolve_ingredients(conn, names):
+    # Сначала ищем в кэше справочника, недостающие добавляем одним INSERT OR IGNORE и одним SELECT.
+    dictionary = get_ingredient_dictionary()
+    resolved = {}
+    missing = {}
+    for name in names:
+        key = normalize_name(name)
+        if not key or key in resolved or key in missing:
+            continue
+        ing_id = dictionary.lookup(key)
+        if ing_id is None:
+            missing[key] = clean_ingredient_name(name)
+        else:
+            resolved[key] = ing_id
+    inserted = []
+    if missing:
+        values = list(missing.values())
+        conn.executemany("INSERT OR IGNORE INTO ingredients (name) VALUES (?)", [(value,) for value in values])
+        for ing_id, name in conn.execute(
+                "SELECT id, name FROM ingredients WHERE name IN (SELECT value FROM json_each(?))",
+                (json.dumps(values),)):
+            resolved[normalize_name(name)] = ing_id
+            inserted.append((ing_id, name))
+    return resolved, inserted
+
+
+def _remember_ingredients(inserted):
+    if _ingredient_dictionary is not None:
+        for ing_id, name in inserted:
+            _ingredient_dictionary.add(ing_id, name)
+
+
+def _ids_for_names(resolved, names):
+    ids = []
+    for name in names:
+        ing_id = resolved.get(normalize_name(name))
+        if ing_id is not None and ing_id not in ids:
+            ids.append(ing_id)
+    return ids
+
+
+def ensure_ingredients(names):
+    conn = get_connection()
+    with conn:
+        resolved, inserted = _resolve_ingredients(conn, names)
+    _remember_ingredients(inserted)
+    if inserted:
+        get_recipe_cache().invalidate_ingredients([ing_id for ing_id, _ in inserted])
+    return _ids_for_names(resolved, names)
+
+
+def _insert_recipe(conn, name, instructions, image_path, ingredient_ids):
+    cursor = conn.execute("INSERT INTO recipes (name, instructions, image_path) VALUES (?, ?, ?)", (name, instructions, image_path))
     recipe_id = cursor.lastrowid
-    for ing_id in ingredient_ids:
-        cursor.execute("INSERT INTO recipe_ingredients (recipe_id, ingredient_id) VALUES (?, ?)", (recipe_id, ing_id))
-    conn.commit()
-    conn.close()
+    conn.executemany("INSERT OR IGNORE INTO recipe_ingredients (recipe_id, ingredient_id) VALUES (?, ?)",
+                     [(recipe_id, ing_id) for ing_id in ingredient_ids])
+    return recipe_id
+
+
+def _update_recipe(conn, recipe_id, name, instructions, image_path, ingredient_ids):
+    conn.execute("UPDATE recipes SET name = ?, instructions = ?, image_path = ? WHERE id = ?", (name, instructions, image_path, recipe_id))
+    conn.execute("DELETE FROM recipe_ingredients WHERE recipe_id = ?", (recipe_id,))
+    conn.executemany("INSERT OR IGNORE INTO recipe_ingredients (recipe_id, ingredient_id) VALUES (?, ?)",
+                     [(recipe_id, ing_id) for ing_id in ingredient_ids])
+
+
+def add_recipe(name, instructions, image_path, ingredient_ids):
+    conn = get_connection()
+    with conn:
+        recipe_id = _insert_recipe(conn, name, instructions, image_path, ingredient_ids)
+    if _recipe_index is not None:
+        _recipe_index.add(recipe_id, ingredient_ids)
+    if _pantry_matrix is not None:
+        _pantry_matrix.update(recipe_id, ingredient_ids)
+    _recipes_changed([recipe_id], RECIPE_INSERTED)
+    return recipe_id
+
+
+def add_recipe_with_ingredients(name, instructions, image_path, ingredient_names):
+    conn = get_connection()
+    with conn:
+        resolved, inserted = _resolve_ingredients(conn, ingredient_names)
+        ingredient_ids = _ids_for_names(resolved, ingredient_names)
+        recipe_id = _insert_recipe(conn, name, instructions, image_path, ingredient_ids)
+    _remember_ingredients(inserted)
+    if _recipe_index is not None:
+        _recipe_index.add(recipe_id, ingredient_ids)
+    if _pantry_matrix is not None:
+        _pantry_matrix.update(recipe_id, ingredient_ids)
+    _recipes_changed([recipe_id], RECIPE_INSERTED)
+    return recipe_id
 
 
 def update_recipe(recipe_id, name, instructions, image_path, ingredient_ids):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE recipes SET name = ?, instructions = ?, image_path = ? WHERE id = ?", (name, instructions, image_path, recipe_id))
-    cursor.execute("DELETE FROM recipe_ingredients WHERE recipe_id = ?", (recipe_id,))
-    for ing_id in ingredient_ids:
-        cursor.execute("INSERT INTO recipe_ingredients (recipe_id, ingredient_id) VALUES (?, ?)", (recipe_id, ing_id))
+    conn = get_connection()
+    with conn:
+        _update_recipe(conn, recipe_id, name, instructions, image_path, ingredient_ids)
+    if _pantry_matrix is not None:
+        _pantry_matrix.update(recipe_id, ingredient_ids, _indexed_ingredients(recipe_id))
+    if _recipe_index is not None:
+        _recipe_index.update(recipe_id, ingredient_ids)
+    _recipes_changed([recipe_id])
 
-    conn.commit()
-    conn.close()
+
+def update_recipe_with_ingredients(recipe_id, name, instructions, image_path, ingredient_names):
+    conn = get_connection()
+    with conn:
+        resolved, inserted = _resolve_ingredients(conn, ingredient_names)
+        ingredient_ids = _ids_for_names(resolved, ingredient_names)
+        _update_recipe(conn, recipe_id, name, instructions, image_path, ingredient_ids)
+    _remember_ingredients(inserted)
+    if _pantry_matrix is not None:
+        _pantry_matrix.update(recipe_id, ingredient_ids, _indexed_ingredients(recipe_id))
+    if _recipe_index is not None:
+        _recipe_index.update(recipe_id, ingredient_ids)
+    _recipes_changed([recipe_id])
 
 
 def delete_recipe(recipe_id):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM recipes WHERE id = ?", (recipe_id,))
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM recipes WHERE id = ?", (recipe_id,))
+    if _pantry_matrix is not None:
+        _pantry_matrix.remove(recipe_id, _indexed_ingredients(recipe_id))
+    if _recipe_index is not None:
+        _recipe_index.remove(recipe_id)
+    _recipes_changed([recipe_id], RECIPE_DELETED)
+
+
+MAINTENANCE_BATCH_SIZE = 1000
+
+
+def purge_orphan_links(after=(0, 0), limit=MAINTENANCE_BATCH_SIZE):
+    # Просматривает до limit связей после ключа after и удаляет те, у которых нет рецепта или ингредиента
+    # (их оставляют записи в базу без foreign_keys). Возвращает (удалено, следующий ключ или None в конце).
+    conn = get_connection()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute("""
+            SELECT ri.recipe_id, ri.ingredient_id,
+                   EXISTS (SELECT 1 FROM recipes WHERE id = ri.recipe_id),
+                   EXISTS (SELECT 1 FROM ingredients WHERE id = ri.ingredient_id)
+            FROM recipe_ingredients ri
+            WHERE (ri.recipe_id, ri.ingredient_id) > (?, ?)
+            ORDER BY ri.recipe_id, ri.ingredient_id
+            LIMIT ?
+        """, (after[0], after[1], limit)).fetchall()
+        orphans = [(recipe_id, ingredient_id) for recipe_id, ingredient_id, has_recipe, has_ingredient in rows
+                   if not (has_recipe and has_ingredient)]
+        conn.executemany("DELETE FROM recipe_ingredients WHERE recipe_id = ? AND ingredient_id = ?", orphans)
+    if orphans:
+        # Сироты редки, поэтому производные структуры проще перестроить, чем чинить по месту.
+        disable_pantry_matrix()
+        if _recipe_index is not None:
+            enable_recipe_index()
+        _recipes_changed(())
+    next_key = tuple(rows[-1][:2]) if len(rows) == limit else None
+    return len(orphans), next_key
+
+
+def purge_unused_ingredients(after=0, keep=(), limit=MAINTENANCE_BATCH_SIZE):
+    # То же для ингредиентов без единого рецепта; keep — нормализованные имена, которые не трогаем.
+    conn = get_connection()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute("""
+            SELECT id, name, EXISTS (SELECT 1 FROM recipe_ingredients WHERE ingredient_id = i.id)
+            FROM ingredients i WHERE id > ? ORDER BY id LIMIT ?
+        """, (after, limit)).fetchall()
+        unused = [ing_id for ing_id, name, used in rows if not used and normalize_name(name) not in keep]
+        conn.executemany("DELETE FROM ingredients WHERE id = ?", [(ing_id,) for ing_id in unused])
+    if unused and _ingredient_dictionary is not None:
+        for ing_id in unused:
+            _ingredient_dictionary.remove(ing_id)
+    next_key = rows[-1][0] if len(rows) == limit else None
+    return len(unused), next_key
+
+
+def page_stats():
+    conn = get_connection()
+    return {
+        'page_size': conn.execute("PRAGMA page_size").fetchone()[0],
+        'page_count': conn.execute("PRAGMA page_count").fetchone()[0],
+        'freelist_count': conn.execute("PRAGMA freelist_count").fetchone()[0],
+        'auto_vacuum': conn.execute("PRAGMA auto_vacuum").fetchone()[0],
+    }
+
+
+def optimize_db(full=False):
+    # optimize с analysis_limit анализирует только устаревшую статистику и ограниченной выборкой.
+    conn = get_connection()
+    if full:
+        conn.execute("ANALYZE")
+    else:
+        conn.execute("PRAGMA analysis_limit = 400")
+        conn.execute("PRAGMA optimize")
     conn.commit()
-    conn.close()
 
 
-def ensure_ingredient_exists(name):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM ingredients WHERE name = ?", (name,))
-    row = cursor.fetchone()
-    if row:
-        conn.close()
-        return row[0]
-    cursor.execute("INSERT INTO ingredients (name) VALUES (?)", (name,))
-    ing_id = cursor.lastrowid
+def incremental_vacuum(pages=None):
+    # Возвращает свободные страницы в конце файла; без auto_vacuum = INCREMENTAL ничего не делает.
+    # Каждый шаг прагмы освобождает одну страницу, а execute делает только первый шаг; executescript — все.
+    conn = get_connection()
+    conn.executescript(f"PRAGMA incremental_vacuum({int(pages)})" if pages else "PRAGMA incremental_vacuum")
+
+
+def vacuum_db():
+    # Полная пересборка файла; заодно применяет auto_vacuum = INCREMENTAL к базе, созданной без него.
+    conn = get_connection()
     conn.commit()
-    conn.close()
-    return ing_id
+    conn.execute("VACUUM")
+
+
+def checkpoint_wal(mode="PASSIVE"):
+    # (занято, страниц в журнале, перенесено в базу).
+    conn = get_connection()
+    return tuple(conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone())
+
+
+def ensure_ingredient_exists(name):
+    ids = ensure_ingredients([name])
+    return ids[0] if ids else None
+
+
+RECIPE_DETAIL_SQL = """
+    SELECT id, name, instructions, image_path FROM recipes
+    WHERE id {}
+"""
+RECIPE_DETAIL_INGREDIENTS_SQL = """
+    SELECT ri.recipe_id, i.id, i.name FROM recipe_ingredients ri
+    JOIN ingredients i ON i.id = ri.ingredient_id
+    WHERE ri.recipe_id {}
+    ORDER BY ri.recipe_id, ri.ingredient_id
+"""
+# Одиночная карточка читается по «= ?»: это заметно дешевле, чем через json_each.
+_SINGLE_DETAIL_SQL = (RECIPE_DETAIL_SQL.format("= ?"), RECIPE_DETAIL_INGREDIENTS_SQL.format("= ?"))
+_BATCH_DETAIL_SQL = (RECIPE_DETAIL_SQL.format("IN (SELECT value FROM json_each(?))"),
+                     RECIPE_DETAIL_INGREDIENTS_SQL.format("IN (SELECT value FROM json_each(?))"))
+
+
+def _load_recipe_details(conn, recipe_ids):
+    recipe_ids = list(recipe_ids)
+    if len(recipe_ids) == 1:
+        (recipe_sql, ingredients_sql), param = _SINGLE_DETAIL_SQL, recipe_ids[0]
+    else:
+        (recipe_sql, ingredients_sql), param = _BATCH_DETAIL_SQL, json.dumps(recipe_ids)
+    details = {}
+    # Обе выборки — из одного снимка базы: иначе между ними может пройти запись другого потока (сервер).
+    own_transaction = not conn.in_transaction
+    if own_transaction:
+        conn.execute("BEGIN")
+    try:
+        for row in conn.execute(recipe_sql, (param,)):
+            details[row[0]] = ({
+                'id': row[0],
+                'name': row[1],
+                'instructions': row[2],
+                'image_path': row[3],
+                'ingredients': []
+            }, [])
+        for recipe_id, ing_id, ing_name in conn.execute(ingredients_sql, (param,)):
+            detail, ingredient_ids = details[recipe_id]
+            detail['ingredients'].append(ing_name)
+            ingredient_ids.append(ing_id)
+    finally:
+        if own_transaction:
+            conn.commit()
+    return details
+
+
+def get_cached_recipe(recipe_id):
+    # Только из памяти, без обращения к базе: годится для GUI-потока.
+    return get_recipe_cache().get(recipe_id, count_miss=False)
 
 
 def get_recipe_by_id(recipe_id):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name, instructions, image_path FROM recipes WHERE id = ?", (recipe_id,))
-    row = cursor.fetchone()
-    if row:
-        cursor.execute("""
-            SELECT i.name FROM ingredients i
-            JOIN recipe_ingredients ri ON i.id = ri.ingredient_id
-            WHERE ri.recipe_id = ?
-        """, (recipe_id,))
-        ingredients = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return {
-            'id': row[0],
-            'name': row[1],
-            'instructions': row[2],
-            'image_path': row[3],
-            'ingredients': ingredients
-        }
-    conn.close()
-    return None
\ No newline at end of file
+    cache = get_recipe_cache()
+    recipe = cache.get(recipe_id)
+    if recipe is not None:
+        return recipe
+    token = cache.token()
+    details = _load_recipe_details(get_connection(), [recipe_id])
+    if recipe_id not in details:
+        return None
+    recipe, ingredient_ids = details[recipe_id]
+    cache.put(recipe, ingredient_ids, token)
+    return dict(recipe, ingredients=list(recipe['ingredients']))
+
+
+def prefetch_recipes(recipe_ids):
+    # Подгружает одним запросом карточки, которых ещё нет в кэше (соседи выбранного рецепта).
+    cache = get_recipe_cache()
+    missing = cache.missing(recipe_ids)
+    if not missing:
+        return 0
+    token = cache.token()
+    details = _load_recipe_details(get_connection(), missing)
+    for recipe, ingredient_ids in details.values():
+        cache.put(recipe, ingredient_ids, token, prefetched=True)
+    return len(details)
@@ -0,0 +1,118 @@
+import itertools
+import queue
+import threading
+import time
+import traceback
+from PyQt6.QtCore import QObject, pyqtSignal
+import database
+import instrumentation
+
+
+class DatabaseWorker(QObject):
+    # Все обращения к базе выполняются в одном фоновом потоке; результат приходит сигналом в GUI-поток.
+    _done = pyqtSignal(int, object, object)
+    # (вид изменения, id рецептов) из database — приходит в GUI-поток, откуда бы ни была запись.
+    recipes_changed = pyqtSignal(str, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._queue = queue.Queue()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._callbacks = {}
+        self._channels = {}
+        self._cancelled = set()
+        self._background = set()
+        self._last_done = time.monotonic()
+        self._done.connect(self._deliver)
+        self._change_listener = self.recipes_changed.emit
+        database.add_change_listener(self._change_listener)
+        self._thread = threading.Thread(target=self._run, name="database-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args, callback=None, error_callback=None, channel=None, background=False):
+        # background — служебный опрос по таймеру: не считается работой для idle_seconds.
+        request_id = next(self._ids)
+        with self._lock:
+            if background:
+                self._background.add(request_id)
+            if channel is not None:
+                previous = self._channels.get(channel)
+                if previous is not None:
+                    self._cancelled.add(previous)
+                self._channels[channel] = request_id
+            self._callbacks[request_id] = (callback, error_callback, channel)
+        self._queue.put((request_id, func, args))
+        return request_id
+
+    def cancel(self, request_id):
+        with self._lock:
+            if request_id in self._callbacks:
+                self._cancelled.add(request_id)
+
+    def is_pending(self, request_id):
+        with self._lock:
+            return request_id in self._callbacks and request_id not in self._cancelled
+
+    def idle_seconds(self):
+        # Сколько секунд поток свободен; 0, пока есть невыполненные или недоставленные запросы.
+        with self._lock:
+            if len(self._callbacks) > len(self._background):
+                return 0.0
+            return time.monotonic() - self._last_done
+
+    def stop(self):
+        database.remove_change_listener(self._change_listener)
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            request_id, func, args = item
+            with self._lock:
+                skip = request_id in self._cancelled
+            if skip:
+                self._done.emit(request_id, None, None)
+                continue
+            try:
+                with instrumentation.timed("worker", func.__name__):
+                    result = func(*args)
+            except Exception as e:
+                traceback.print_exc()
+                self._done.emit(request_id, None, e)
+            else:
+                self._done.emit(request_id, result, None)
+        database.close_connection()
+
+    def _deliver(self, request_id, result, error):
+        with self._lock:
+            callback, error_callback, channel = self._callbacks.pop(request_id, (None, None, None))
+            cancelled = request_id in self._cancelled
+            self._cancelled.discard(request_id)
+            if channel is not None and self._channels.get(channel) == request_id:
+                del self._channels[channel]
+            if request_id in self._background:
+                self._background.discard(request_id)
+            else:
+                self._last_done = time.monotonic()
+        if cancelled:
+            return
+        if error is not None:
+            if error_callback:
+                error_callback(error)
+            return
+        if callback:
+            callback(result)
+
+
+_worker = None
+
+
+def get_database_worker():
+    global _worker
+    if _worker is None:
+        _worker = DatabaseWorker()
+    return _worker
@@ -0,0 +1,209 @@
+import os
+import sys
+import glob
+import hashlib
+import argparse
+from PyQt6.QtCore import Qt, QBuffer, QByteArray, QIODevice
+from PyQt6.QtGui import QImageReader
+import database
+import instrumentation
+
+MAX_IMAGE_SIZE = 1600
+THUMBNAIL_SIZE = 400
+JPEG_QUALITY = 90
+HASH_CHUNK = 1024 * 1024
+
+
+def store_root():
+    return database.data_root()
+
+
+def is_store_key(image_path):
+    return bool(image_path) and image_path.replace('\\', '/').startswith(database.IMAGE_STORE_PREFIX)
+
+
+def resolve_image_path(image_path):
+    return database.resolve_data_path(image_path)
+
+
+def image_exists(path):
+    return database.is_blob_key(path) or bool(path) and os.path.exists(path)
+
+
+def resolve_thumbnail_path(image_path):
+    if not is_store_key(image_path):
+        return image_path
+    base, ext = os.path.splitext(image_path)
+    return os.path.join(store_root(), f"{base}_thumb{ext}")
+
+
+def stored_thumbnail(path):
+    # Миниатюра, сохранённая при загрузке рядом с картинкой из images/; для остальных файлов — None.
+    try:
+        key = os.path.relpath(path, store_root()).replace('\\', '/')
+    except ValueError:
+        return None
+    if not is_store_key(key):
+        return None
+    thumb_path = resolve_thumbnail_path(key)
+    return thumb_path if os.path.exists(thumb_path) else None
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _existing_key(digest):
+    folder = f"{database.IMAGE_STORE_PREFIX}{digest[:2]}"
+    for ext in (".jpg", ".png"):
+        key = f"{folder}/{digest}{ext}"
+        if os.path.exists(os.path.join(store_root(), key)):
+            return key
+    return None
+
+
+def _scaled(image, max_size):
+    if image.width() > max_size or image.height() > max_size:
+        image = image.scaled(max_size, max_size, Qt.AspectRatioMode.KeepAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation)
+    return image
+
+
+def _encode_scaled(image, max_size, fmt):
+    # Кодируем прямо в QByteArray: в базу он пишется кусками через свой буфер, без копии в bytes.
+    image = _scaled(image, max_size)
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    ok = image.save(buffer, fmt, JPEG_QUALITY if fmt == "JPG" else -1)
+    buffer.close()
+    return (data, image.width(), image.height()) if ok else None
+
+
+def _save_scaled(image, max_size, path, fmt):
+    image = _scaled(image, max_size)
+    tmp_path = path + ".tmp"
+    if not image.save(tmp_path, fmt, JPEG_QUALITY if fmt == "JPG" else -1):
+        return False
+    os.replace(tmp_path, path)
+    return True
+
+
+def _read_image(path):
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    with instrumentation.timed("image", "ingest decode", os.path.basename(path)):
+        image = reader.read()
+    if image.isNull():
+        print(f"[!] Не удалось прочитать изображение {path}: {reader.errorString()}")
+    return image
+
+
+def ingest_image(path):
+    # Кладёт уменьшенную копию и миниатюру в images/<hash> (или в таблицу recipe_images); в рецепт пишется ключ.
+    # Относительный путь — это уже ключ в папке данных (resources/..., images/...) или в базе: его не трогаем.
+    if not path or not database.is_absolute_path(path) or not os.path.exists(path):
+        return path
+    if database.image_storage_mode() == database.IMAGE_STORAGE_DB:
+        return ingest_image_blob(path)
+    digest = file_digest(path)
+    key = _existing_key(digest)
+    if key:
+        return key
+
+    image = _read_image(path)
+    if image.isNull():
+        return path
+    fmt, ext = ("PNG", ".png") if image.hasAlphaChannel() else ("JPG", ".jpg")
+    key = f"{database.IMAGE_STORE_PREFIX}{digest[:2]}/{digest}{ext}"
+    full_path = os.path.join(store_root(), key)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    if not _save_scaled(image, THUMBNAIL_SIZE, resolve_thumbnail_path(key), fmt) or \
+            not _save_scaled(image, MAX_IMAGE_SIZE, full_path, fmt):
+        print(f"[!] Не удалось сохранить изображение {path} в хранилище")
+        return path
+    return key
+
+
+def ingest_image_blob(path):
+    digest = file_digest(path)
+    if database.has_image_blob(digest):
+        return database.image_blob_key(digest)
+    image = _read_image(path)
+    if image.isNull():
+        return path
+    fmt = "PNG" if image.hasAlphaChannel() else "JPG"
+    variants = []
+    for kind, max_size in (("thumb", THUMBNAIL_SIZE), ("full", MAX_IMAGE_SIZE)):
+        encoded = _encode_scaled(image, max_size, fmt)
+        if encoded is None:
+            print(f"[!] Не удалось сохранить изображение {path} в базу")
+            return path
+        data, width, height = encoded
+        variants.append((kind, fmt, width, height, data))
+    return database.write_image_blobs(digest, variants)
+
+
+def default_image():
+    # В режиме хранения в базе и картинка по умолчанию берётся оттуда — по ключу, сохранённому при переносе.
+    if database.image_storage_mode() == database.IMAGE_STORAGE_DB:
+        key = database.default_image_key()
+        if database.is_blob_key(key):
+            return key
+    return database.DEFAULT_IMAGE
+
+
+def migrate_images_to_db():
+    # Включает хранение в базе и переносит туда resources/*.png и всё, на что ссылаются рецепты.
+    database.set_image_storage_mode(database.IMAGE_STORAGE_DB)
+    conn = database.get_connection()
+    paths = {row[0] for row in conn.execute(
+        "SELECT DISTINCT image_path FROM recipes WHERE image_path IS NOT NULL AND image_path != ''")}
+    paths.update(os.path.relpath(path, store_root()).replace('\\', '/')
+                 for path in glob.glob(os.path.join(store_root(), "resources", "*.png")))
+    mapping = {}
+    for path in sorted(paths):
+        if database.is_blob_key(path):
+            continue
+        source = resolve_image_path(path)
+        if not os.path.exists(source):
+            print(f"[!] Файл изображения не найден: {source}")
+            continue
+        key = ingest_image_blob(source)
+        if database.is_blob_key(key):
+            mapping[path] = key
+    default_key = mapping.get(database.DEFAULT_IMAGE)
+    if default_key is None:
+        # resources рядом с базой нет — берём картинку из комплекта программы.
+        source = database.resource_path(database.DEFAULT_IMAGE)
+        if os.path.exists(source):
+            default_key = ingest_image_blob(source)
+    if database.is_blob_key(default_key):
+        database.set_default_image_key(default_key)
+    updated = database.replace_image_paths(mapping)
+    print(f"[!] Изображений в базе: {len(mapping)}, рецептов обновлено: {updated}")
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Хранилище изображений рецептов")
+    parser.add_argument("--to-db", action="store_true",
+                        help="хранить изображения в базе (таблица recipe_images) и перенести туда существующие")
+    parser.add_argument("--db", help="путь к базе (по умолчанию recipes.db рядом с программой)")
+    args = parser.parse_args()
+    if args.db:
+        database.DB_PATH = args.db
+    database.init_db()
+    if args.to_db:
+        migrate_images_to_db()
+    else:
+        print(f"Режим хранения изображений: {database.image_storage_mode()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
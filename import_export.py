@@ -0,0 +1,146 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import database
+
+FORMATS = ("block", "jsonl", "csv")
+CSV_FIELDS = ("name", "ingredients", "instructions", "image_path")
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".json"):
+        return "jsonl"
+    if ext == ".csv":
+        return "csv"
+    return "block"
+
+
+def _normalize_record(record):
+    ingredients = record.get('ingredients') or []
+    if isinstance(ingredients, str):
+        ingredients = ingredients.split(',')
+    return {
+        'name': (record.get('name') or "").strip(),
+        'instructions': (record.get('instructions') or "").strip(),
+        'image_path': (record.get('image_path') or "").strip(),
+        'ingredients': [ing.strip() for ing in ingredients if ing.strip()]
+    }
+
+
+def iter_jsonl(f):
+    for line_no, line in enumerate(f, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield _normalize_record(json.loads(line))
+        except (ValueError, AttributeError) as e:
+            print(f"[!] Строка {line_no}: некорректный JSON ({e})")
+
+
+def iter_csv(f):
+    for record in csv.DictReader(f):
+        yield _normalize_record(record)
+
+
+def read_recipes(f, fmt):
+    if fmt == "jsonl":
+        records = iter_jsonl(f)
+    elif fmt == "csv":
+        records = iter_csv(f)
+    else:
+        records = database.iter_recipe_blocks(f)
+    return (record for record in records if record['name'])
+
+
+def write_recipes(f, fmt, recipes):
+    writer = csv.DictWriter(f, CSV_FIELDS) if fmt == "csv" else None
+    if writer:
+        writer.writeheader()
+    count = 0
+    for recipe in recipes:
+        if fmt == "jsonl":
+            f.write(json.dumps({field: recipe[field] for field in CSV_FIELDS}, ensure_ascii=False) + "\n")
+        elif fmt == "csv":
+            row = {field: recipe[field] for field in CSV_FIELDS}
+            row['ingredients'] = ", ".join(recipe['ingredients'])
+            writer.writerow(row)
+        else:
+            fields = (recipe['name'], ", ".join(recipe['ingredients']), recipe['instructions'], recipe['image_path'])
+            f.write("\n".join(database.format_block_field(field) for field in fields) + "\n\n")
+        count += 1
+        yield count
+
+
+class Progress:
+    def __init__(self, label, every=1):
+        self.label = label
+        self.every = every
+        self.start = time.perf_counter()
+        self.count = 0
+
+    def __call__(self, count):
+        self.count = count
+        if count % self.every == 0:
+            self.report(final=False)
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.start
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def report(self, final=True):
+        elapsed = time.perf_counter() - self.start
+        end = "\n" if final else "\r"
+        print(f"[!] {self.label}: {self.count} рецептов, {elapsed:.1f} с, {self.rate():.0f} рец/с", end=end, flush=True)
+
+
+def import_file(path, fmt=None, chunk_size=database.BULK_CHUNK_SIZE):
+    fmt = fmt or detect_format(path)
+    progress = Progress("Импорт")
+    with open(path, "r", encoding="utf-8", newline="" if fmt == "csv" else None) as f:
+        database.bulk_add_recipes(read_recipes(f, fmt), chunk_size=chunk_size, progress=progress)
+    progress.report()
+    return progress.count
+
+
+def export_file(path, fmt=None):
+    fmt = fmt or detect_format(path)
+    progress = Progress("Экспорт", every=10000)
+    with open(path, "w", encoding="utf-8", newline="" if fmt == "csv" else None) as f:
+        for count in write_recipes(f, fmt, database.iter_recipes_for_export()):
+            progress(count)
+    progress.report()
+    return progress.count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Импорт и экспорт каталога рецептов")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="по умолчанию определяется по расширению файла")
+    parser.add_argument("--db", help="путь к recipes.db (по умолчанию рядом с программой)")
+    parser.add_argument("--chunk-size", type=int, default=database.BULK_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.db:
+        database.DB_PATH = os.path.abspath(args.db)
+    if os.path.exists(database.DB_PATH):
+        database.migrate_db()
+    else:
+        conn = database.get_connection()
+        database.create_base_schema(conn)
+        database.migrate_db(conn)
+
+    if args.command == "import":
+        import_file(args.path, args.format, args.chunk_size)
+    else:
+        export_file(args.path, args.format)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
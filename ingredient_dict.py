@@ -0,0 +1,128 @@
+import threading
+
+_END = ""
+
+
+def normalize_name(name):
+    return " ".join(name.lower().replace("ё", "е").split())
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class IngredientDictionary:
+    # Кэш справочника ингредиентов: префиксное дерево для автодополнения и триграммы для опечаток.
+    def __init__(self, rows=()):
+        self._ids = {}
+        self._names = {}
+        self._trie = {}
+        self._trigrams = {}
+        self._lock = threading.Lock()
+        for ingredient_id, name in rows:
+            self._add(ingredient_id, name)
+
+    # Читатели тоже берут блокировку: сервер ищет из нескольких потоков, пока поток записи меняет справочник.
+    def __len__(self):
+        with self._lock:
+            return len(self._names)
+
+    def __contains__(self, name):
+        key = normalize_name(name)
+        with self._lock:
+            return key in self._ids
+
+    def add(self, ingredient_id, name):
+        with self._lock:
+            self._add(ingredient_id, name)
+
+    def remove(self, ingredient_id):
+        with self._lock:
+            name = self._names.pop(ingredient_id, None)
+            if name is None:
+                return
+            key = normalize_name(name)
+            if self._ids.get(key) == ingredient_id:
+                del self._ids[key]
+            for word in self._word_starts(key):
+                node = self._trie
+                for char in word:
+                    node = node.get(char)
+                    if node is None:
+                        break
+                else:
+                    node.get(_END, set()).discard(ingredient_id)
+            for gram in trigrams(key):
+                self._trigrams.get(gram, set()).discard(ingredient_id)
+
+    def lookup(self, name):
+        key = normalize_name(name)
+        with self._lock:
+            return self._ids.get(key)
+
+    def name_of(self, ingredient_id):
+        with self._lock:
+            return self._names.get(ingredient_id)
+
+    def complete(self, prefix, limit=10):
+        prefix = normalize_name(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            return self._complete(prefix, limit)
+
+    def suggest(self, name, limit=5, threshold=0.2):
+        key = normalize_name(name)
+        if not key:
+            return []
+        with self._lock:
+            return self._suggest(key, limit, threshold)
+
+    def _complete(self, prefix, limit):
+        node = self._trie
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        found = []
+        stack = [node]
+        while stack and len(found) < limit * 4:
+            current = stack.pop()
+            found.extend(current.get(_END, ()))
+            stack.extend(child for char, child in sorted(current.items(), reverse=True) if char != _END)
+        names = sorted({self._names[i] for i in found if i in self._names},
+                       key=lambda n: (not normalize_name(n).startswith(prefix), len(n), n))
+        return names[:limit]
+
+    def _suggest(self, key, limit, threshold):
+        grams = trigrams(key)
+        shared = {}
+        for gram in grams:
+            for ingredient_id in self._trigrams.get(gram, ()):
+                shared[ingredient_id] = shared.get(ingredient_id, 0) + 1
+        scored = []
+        for ingredient_id, common in shared.items():
+            other = trigrams(normalize_name(self._names[ingredient_id]))
+            score = common / (len(grams) + len(other) - common)
+            if score >= threshold:
+                scored.append((-score, self._names[ingredient_id]))
+        scored.sort()
+        return [n for _, n in scored[:limit]]
+
+    def _add(self, ingredient_id, name):
+        key = normalize_name(name)
+        self._names[ingredient_id] = name
+        self._ids.setdefault(key, ingredient_id)
+        for word in self._word_starts(key):
+            node = self._trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node.setdefault(_END, set()).add(ingredient_id)
+        for gram in trigrams(key):
+            self._trigrams.setdefault(gram, set()).add(ingredient_id)
+
+    @staticmethod
+    def _word_starts(key):
+        words = key.split(" ")
+        return [" ".join(words[i:]) for i in range(len(words))]
@@ -0,0 +1,280 @@
+import os
+import re
+import json
+import time
+import atexit
+import sqlite3
+import threading
+import functools
+from collections import deque
+
+PROFILE_ENV = "RECIPE_PROFILE"
+SLOW_LOG_SIZE = 200
+SAMPLES_PER_OPERATION = 5000
+SLOW_THRESHOLDS_MS = {"sql": 20, "slot": 50, "worker": 100, "image": 50}
+DEFAULT_SLOW_MS = 50
+STATEMENT_NAME_LENGTH = 160
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+@functools.lru_cache(maxsize=1024)
+def statement_name(sql):
+    return re.sub(r"\s+", " ", sql).strip()[:STATEMENT_NAME_LENGTH]
+
+
+class Profiler:
+    # Последние замеры по каждой операции для перцентилей и кольцевой журнал медленных операций.
+    def __init__(self, slow_log_size=SLOW_LOG_SIZE, samples=SAMPLES_PER_OPERATION, thresholds=None):
+        self.samples = samples
+        self.thresholds = dict(SLOW_THRESHOLDS_MS, **(thresholds or {}))
+        self.slow_log = deque(maxlen=slow_log_size)
+        self._operations = {}
+        self._lock = threading.Lock()
+
+    def record(self, category, name, seconds, rows=None, detail=None):
+        ms = seconds * 1000
+        key = (category, name)
+        with self._lock:
+            operation = self._operations.get(key)
+            if operation is None:
+                operation = self._operations[key] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0,
+                                                     "samples": deque(maxlen=self.samples)}
+            operation["count"] += 1
+            operation["total_ms"] += ms
+            operation["max_ms"] = max(operation["max_ms"], ms)
+            operation["rows"] += rows or 0
+            operation["samples"].append(ms)
+            if ms >= self.thresholds.get(category, DEFAULT_SLOW_MS):
+                self.slow_log.append({
+                    "time": time.strftime("%H:%M:%S"),
+                    "category": category,
+                    "name": name,
+                    "ms": round(ms, 3),
+                    "rows": rows,
+                    "detail": detail,
+                    "thread": threading.current_thread().name,
+                })
+
+    def stats(self):
+        with self._lock:
+            operations = [(key, dict(operation, samples=sorted(operation["samples"])))
+                          for key, operation in self._operations.items()]
+        result = []
+        for (category, name), operation in operations:
+            samples = operation["samples"]
+            result.append({
+                "category": category,
+                "name": name,
+                "count": operation["count"],
+                "rows": operation["rows"],
+                "total_ms": round(operation["total_ms"], 3),
+                "max_ms": round(operation["max_ms"], 3),
+                "p50_ms": round(percentile(samples, 0.50), 3),
+                "p95_ms": round(percentile(samples, 0.95), 3),
+                "p99_ms": round(percentile(samples, 0.99), 3),
+            })
+        result.sort(key=lambda item: item["total_ms"], reverse=True)
+        return result
+
+    def slow_operations(self):
+        with self._lock:
+            return list(self.slow_log)
+
+    def report(self):
+        return {"operations": self.stats(), "slow": self.slow_operations()}
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+    def format_report(self, top=30):
+        lines = [f"{'операция':<60} {'раз':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  мс"]
+        for item in self.stats()[:top]:
+            name = f"{item['category']}: {item['name']}"
+            lines.append(f"{name[:60]:<60} {item['count']:>7} {item['p50_ms']:>9.2f} {item['p95_ms']:>9.2f} "
+                         f"{item['p99_ms']:>9.2f} {item['max_ms']:>9.2f}")
+        lines.append("")
+        lines.append("Медленные операции (последние):")
+        for item in reversed(self.slow_operations()):
+            lines.append(f"{item['time']} {item['ms']:9.2f} мс  {item['category']}: {item['name'][:80]}"
+                         + (f"  [{item['detail']}]" if item['detail'] else ""))
+        return "\n".join(lines)
+
+    def reset(self):
+        with self._lock:
+            self._operations.clear()
+            self.slow_log.clear()
+
+
+profiler = None
+
+
+def enable(**kwargs):
+    # Включать до открытия соединений: профилируются только соединения, открытые после этого.
+    global profiler
+    if profiler is None:
+        profiler = Profiler(**kwargs)
+    return profiler
+
+
+def disable():
+    global profiler
+    profiler = None
+
+
+def record(category, name, seconds, rows=None, detail=None):
+    if profiler is not None:
+        profiler.record(category, name, seconds, rows, detail)
+
+
+class timed:
+    def __init__(self, category, name, detail=None):
+        self.category = category
+        self.name = name
+        self.detail = detail
+        self.start = None
+
+    def __enter__(self):
+        if profiler is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            record(self.category, self.name, time.perf_counter() - self.start, detail=self.detail)
+        return False
+
+
+def timed_slot(func):
+    # Qt передаёт в слот все аргументы сигнала; лишние отбрасываем, как это делает PyQt для обычных методов.
+    arg_count = func.__code__.co_argcount - 1
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(self, *args):
+        args = args[:arg_count]
+        if profiler is None:
+            return func(self, *args)
+        start = time.perf_counter()
+        try:
+            return func(self, *args)
+        finally:
+            record("slot", name, time.perf_counter() - start)
+    return wrapper
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    # Время запроса считается от execute до последней выбранной строки.
+    _statement = None
+    _elapsed = 0.0
+    _rows = 0
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._begin(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._begin(sql, time.perf_counter() - start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(time.perf_counter() - start, 0 if row is None else 1)
+        self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(time.perf_counter() - start, len(rows))
+        if not rows or len(rows) < (self.arraysize if size is None else size):
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(time.perf_counter() - start, len(rows))
+        self._finish()
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(time.perf_counter() - start, 0)
+            self._finish()
+            raise
+        self._fetched(time.perf_counter() - start, 1)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+    def _begin(self, sql, elapsed):
+        self._statement = sql
+        self._elapsed = elapsed
+        self._rows = 0
+        if self.description is None:
+            self._rows = max(self.rowcount, 0)
+            self._finish()
+
+    def _fetched(self, elapsed, rows):
+        self._elapsed += elapsed
+        self._rows += rows
+
+    def _finish(self):
+        if self._statement is None:
+            return
+        record("sql", statement_name(self._statement), self._elapsed, rows=self._rows)
+        self._statement = None
+
+
+class ProfiledConnection(sqlite3.Connection):
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory():
+    return ProfiledConnection if profiler is not None else sqlite3.Connection
+
+
+def _enable_from_environment():
+    # RECIPE_PROFILE=1 включает замеры, RECIPE_PROFILE=путь.json ещё и сохраняет отчёт при выходе.
+    value = os.environ.get(PROFILE_ENV, "")
+    if not value or value == "0":
+        return
+    enable()
+    if value.lower().endswith(".json"):
+        atexit.register(lambda: profiler is not None and profiler.dump(value))
+
+
+_enable_from_environment()
@@ -0,0 +1,133 @@
+from collections import OrderedDict
+
+import database
+from recipe_index import MaskIds
+
+SEARCH_CACHE_SIZE = 64
+TEXT_SEARCH_LIMIT = 500
+
+
+def split_query(text):
+    return [x.strip() for x in text.split(",") if x.strip()]
+
+
+def parse_query(text, live=False):
+    # (id известных ингредиентов, остальные слова запроса).
+    dictionary = database.get_ingredient_dictionary()
+    names = split_query(text)
+    if live and names and not text.rstrip().endswith(","):
+        # Недописанное слово, с которого начинается какой-то ингредиент, пока не учитываем.
+        last = names[-1]
+        if dictionary.lookup(last) is None and dictionary.complete(last, limit=1):
+            names = names[:-1]
+    ids = []
+    unknown = []
+    for name in names:
+        ing_id = dictionary.lookup(name)
+        if ing_id is None:
+            unknown.append(name)
+        elif ing_id not in ids:
+            ids.append(ing_id)
+    return ids, unknown
+
+
+def unknown_hints(words):
+    dictionary = database.get_ingredient_dictionary()
+    hints = []
+    for name in words:
+        suggestions = dictionary.suggest(name, limit=3)
+        if suggestions:
+            hints.append(f"«{name}» — возможно, {', '.join(suggestions)}?")
+        else:
+            hints.append(f"«{name}» не найден")
+    return hints
+
+
+def filter_recipes(text, recipe_ids, live=False, text_search=True):
+    # Какие из recipe_ids попали бы в результат запроса text; проверяются только они, без поиска по всей базе.
+    # text_search=False — запрос уже ответил без текстового поиска (по словам ничего не нашлось).
+    ids, words = parse_query(text, live)
+    ids = set(ids)
+    ingredients = database.get_recipe_ingredient_ids(recipe_ids)
+    matching = [recipe_id for recipe_id in recipe_ids if recipe_id in ingredients and ids <= ingredients[recipe_id]]
+    if words and text_search and matching:
+        matching = database.filter_recipes_text(" ".join(words), matching)
+    return matching
+
+
+class SearchSession:
+    # Результаты последних запросов по ключу (ингредиенты, слова). Новый ингредиент сужает
+    # ранее найденный набор, а после Backspace результат берётся из кэша без запроса к базе.
+    def __init__(self, cache_size=SEARCH_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.hits = 0
+        self.narrowed = 0
+        self.queries = 0
+        self._results = OrderedDict()
+        self._version = None
+
+    def find(self, text, live=False):
+        ids, unknown = parse_query(text, live)
+        recipe_ids, hints = self._lookup(frozenset(ids), tuple(unknown))
+        return recipe_ids, list(hints)
+
+    def _lookup(self, ids, words):
+        version = (database.DB_PATH, database.data_version(), database.get_recipe_index() is not None)
+        if version != self._version:
+            self._results.clear()
+            self._version = version
+        key = (ids, words)
+        result = self._results.get(key)
+        if result is not None:
+            self._results.move_to_end(key)
+            self.hits += 1
+            return result
+        result = self._search(ids, words)
+        self._results[key] = result
+        while len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+        return result
+
+    def _base(self, ids, words):
+        # Самый узкий из закэшированных запросов с теми же словами и частью тех же ингредиентов.
+        best = None
+        for (cached_ids, cached_words), result in self._results.items():
+            if cached_words != words or not cached_ids < ids or result[1]:
+                continue
+            # Текстовый поиск обрезан по TEXT_SEARCH_LIMIT: сужать можно только полный список.
+            if isinstance(result[0], list) and len(result[0]) >= TEXT_SEARCH_LIMIT:
+                continue
+            if best is None or len(cached_ids) > len(best[0]):
+                best = (cached_ids, result[0])
+        return best
+
+    def _search(self, ids, words):
+        index = database.get_recipe_index()
+        base = self._base(ids, words) if index is not None else None
+        if base is not None:
+            base_ids, base_result = base
+            if isinstance(base_result, MaskIds):
+                result = MaskIds(index.mask_of(ids - base_ids, base=base_result.mask))
+            else:
+                result = index.filter(base_result, ids - base_ids)
+            # Пустой текстовый результат полный запрос заменил бы поиском только по ингредиентам с подсказками.
+            if result or not words:
+                self.narrowed += 1
+                return result, ()
+
+        self.queries += 1
+        hints = []
+        if words:
+            # Всё, что не похоже на ингредиент, ищем по названию и тексту рецепта.
+            recipe_ids = [rec[0] for rec in database.search_recipes_text(" ".join(words), list(ids),
+                                                                         limit=TEXT_SEARCH_LIMIT)]
+            if recipe_ids:
+                return recipe_ids, ()
+            hints = unknown_hints(words)
+        if index is not None:
+            return MaskIds(index.mask_of(ids)), tuple(hints)
+        return database.get_recipe_ids_by_ingredients(list(ids)), tuple(hints)
+
+    def stats(self):
+        return {'cached': len(self._results), 'hits': self.hits, 'narrowed': self.narrowed, 'queries': self.queries}
+
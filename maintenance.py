@@ -0,0 +1,144 @@
+import argparse
+import os
+import sys
+import time
+
+import database
+from ingredient_dict import normalize_name
+
+IDLE_TIME_BUDGET = 0.5
+IDLE_VACUUM_PAGES = 2000
+IDLE_CONVERT_LIMIT = 64 * 1024 * 1024
+PASS_INTERVAL = 15 * 60
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class MaintenanceJob:
+    # Обслуживание базы по шагам: чистка сирот и лишних ингредиентов, статистика, возврат свободных
+    # страниц и перенос WAL в базу. С ограничением времени проход прерывается и продолжается со следующего run.
+    def __init__(self):
+        self._links_after = (0, 0)
+        self._ingredients_after = 0
+        self._keep = None
+        self.finished_at = None
+
+    def due(self, interval=PASS_INTERVAL):
+        return self.finished_at is None or time.monotonic() - self.finished_at >= interval
+
+    def run(self, time_budget=None, vacuum_pages=None, convert_limit=None, checkpoint="PASSIVE",
+            full_analyze=False):
+        # Вызывать из потока, через который идут записи: удалённые ингредиенты сразу пропадают из справочника.
+        started = time.perf_counter()
+        deadline = started + time_budget if time_budget else None
+        before = database.page_stats()
+        report = {'orphan_links': 0, 'unused_ingredients': 0, 'converted': False, 'steps': {}}
+
+        def step(name, func, *args):
+            step_started = time.perf_counter()
+            result = func(*args)
+            report['steps'][name] = report['steps'].get(name, 0.0) + time.perf_counter() - step_started
+            return result
+
+        def out_of_time():
+            return deadline is not None and time.perf_counter() >= deadline
+
+        if self._keep is None:
+            # Ингредиенты из стартового списка нужны автодополнению, даже если ни один рецепт их не использует.
+            self._keep = {normalize_name(name) for name in database.load_ingredients_from_file()}
+
+        while self._links_after is not None and not out_of_time():
+            removed, self._links_after = step("orphan_links", database.purge_orphan_links, self._links_after)
+            report['orphan_links'] += removed
+        while (self._links_after is None and self._ingredients_after is not None
+               and not out_of_time()):
+            removed, self._ingredients_after = step("unused_ingredients", database.purge_unused_ingredients,
+                                                    self._ingredients_after, self._keep)
+            report['unused_ingredients'] += removed
+        purged = self._links_after is None and self._ingredients_after is None
+
+        if purged and not out_of_time():
+            step("optimize", database.optimize_db, full_analyze)
+            size = before['page_count'] * before['page_size']
+            if before['auto_vacuum'] != AUTO_VACUUM_INCREMENTAL and (convert_limit is None or size <= convert_limit):
+                step("vacuum", database.vacuum_db)
+                report['converted'] = True
+            else:
+                step("incremental_vacuum", database.incremental_vacuum, vacuum_pages)
+        # PASSIVE сообщает, сколько страниц перенесено; TRUNCATE после него только обрезает файл журнала.
+        busy, report['wal_pages'], report['wal_checkpointed'] = step("checkpoint", database.checkpoint_wal)
+        if checkpoint != "PASSIVE":
+            busy = step("checkpoint", database.checkpoint_wal, checkpoint)[0]
+        report['checkpoint_busy'] = bool(busy)
+        report['wal_size'] = wal_size()
+
+        after = database.page_stats()
+        report['page_size'] = after['page_size']
+        report['pages_before'] = before['page_count']
+        report['pages_after'] = after['page_count']
+        # После перевода в incremental файл может даже вырасти на страницы карты указателей.
+        report['reclaimed_pages'] = max(before['page_count'] - after['page_count'], 0)
+        report['freelist_pages'] = after['freelist_count']
+        report['auto_vacuum'] = after['auto_vacuum']
+        report['seconds'] = time.perf_counter() - started
+        # Без incremental-режима свободные страницы вернёт только полный VACUUM, их не ждём.
+        report['complete'] = purged and 'optimize' in report['steps'] and (
+            after['auto_vacuum'] != AUTO_VACUUM_INCREMENTAL or not after['freelist_count'])
+        if report['complete']:
+            self._links_after = (0, 0)
+            self._ingredients_after = 0
+            self.finished_at = time.monotonic()
+        return report
+
+
+def wal_size():
+    path = database.DB_PATH + "-wal"
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def run_idle_step(job):
+    # Короткий шаг для простоя окна: не дольше IDLE_TIME_BUDGET и без долгой перестройки большой базы.
+    return job.run(IDLE_TIME_BUDGET, IDLE_VACUUM_PAGES, IDLE_CONVERT_LIMIT)
+
+
+def format_report(report):
+    reclaimed = report['reclaimed_pages'] * report['page_size']
+    lines = [
+        f"удалено связей без рецепта или ингредиента: {report['orphan_links']}",
+        f"удалено неиспользуемых ингредиентов: {report['unused_ingredients']}",
+        f"страниц: {report['pages_before']} -> {report['pages_after']} "
+        f"(освобождено {report['reclaimed_pages']}, {reclaimed / 1024:.0f} КиБ; свободных осталось {report['freelist_pages']})",
+    ]
+    if report['converted']:
+        lines.append("база пересобрана с auto_vacuum = INCREMENTAL")
+    lines.append(f"WAL: перенесено {report['wal_checkpointed']} из {report['wal_pages']} страниц, "
+                 f"файл журнала {report['wal_size'] / 1024:.0f} КиБ" + (" (база занята)" if report['checkpoint_busy'] else ""))
+    steps = ", ".join(f"{name} {seconds * 1000:.1f} мс" for name, seconds in report['steps'].items())
+    lines.append(f"время: {report['seconds'] * 1000:.1f} мс ({steps})")
+    if not report['complete']:
+        lines.append("проход не завершён, продолжится при следующем запуске")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Обслуживание базы рецептов")
+    parser.add_argument("--db", help="путь к recipes.db (по умолчанию рядом с программой)")
+    parser.add_argument("--time-budget", type=float, help="секунд на чистку; по умолчанию без ограничения")
+    parser.add_argument("--analyze", action="store_true", help="полный ANALYZE вместо PRAGMA optimize")
+    parser.add_argument("--no-convert", action="store_true",
+                        help="не пересобирать базу без auto_vacuum = INCREMENTAL (VACUUM блокирует запись)")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        database.DB_PATH = os.path.abspath(args.db)
+    if not os.path.exists(database.DB_PATH):
+        print(f"[!] База {database.DB_PATH} не найдена.")
+        return 1
+    database.migrate_db()
+    report = MaintenanceJob().run(args.time_budget, convert_limit=0 if args.no_convert else None,
+                                  checkpoint="TRUNCATE", full_analyze=args.analyze)
+    print(format_report(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
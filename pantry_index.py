@@ -0,0 +1,116 @@
+import heapq
+import threading
+
+PANTRY_LIMIT = 200
+
+
+def load_numpy():
+    # numpy нужен только для режима «Что приготовить»; без него работает запасной путь через SQL.
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def coverage_score(matched, size, pantry_size):
+    # Доля общих ингредиентов среди объединения «рецепт ∪ кладовая» (мера Жаккара).
+    return matched / (size + pantry_size - matched)
+
+
+def top_by_coverage(rows, pantry_size, limit=PANTRY_LIMIT):
+    # rows: (recipe_id, matched, size). Ограниченная куча на limit элементов.
+    scored = ((coverage_score(matched, size, pantry_size), matched, -recipe_id, size)
+              for recipe_id, matched, size in rows if matched)
+    return [(-neg_id, matched, size - matched, score)
+            for score, matched, neg_id, size in heapq.nlargest(limit, scored)]
+
+
+class PantryMatrix:
+    # Матрица рецепт×ингредиент, хранимая по столбцам: ingredient_id -> отсортированный массив id рецептов.
+    # Строка матрицы — это сам id рецепта, поэтому запись меняет только затронутые столбцы.
+    def __init__(self, np):
+        self.np = np
+        self._columns = {}
+        self._sizes = np.zeros(1, dtype=np.int16)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, np, columns):
+        # columns: (ingredient_id, "id,id,...") — GROUP_CONCAT читается заметно быстрее, чем пары построчно.
+        matrix = cls(np)
+        for ingredient_id, recipe_ids in columns:
+            matrix._columns[ingredient_id] = np.unique(np.array(recipe_ids.split(","), dtype=np.int32))
+        if matrix._columns:
+            matrix._sizes = np.bincount(np.concatenate(list(matrix._columns.values()))).astype(np.int16)
+        return matrix
+
+    def __len__(self):
+        return int(self.np.count_nonzero(self._sizes))
+
+    def size_of(self, recipe_id):
+        return int(self._sizes[recipe_id]) if recipe_id < len(self._sizes) else 0
+
+    def update(self, recipe_id, ingredient_ids, previous=None):
+        # previous — прежние ингредиенты рецепта, если известны: тогда не нужно искать его во всех столбцах.
+        np = self.np
+        ingredient_ids = set(ingredient_ids)
+        with self._lock:
+            self._remove(recipe_id, previous)
+            if recipe_id >= len(self._sizes):
+                sizes = np.zeros(max(recipe_id + 1, len(self._sizes) * 2), dtype=np.int16)
+                sizes[:len(self._sizes)] = self._sizes
+                self._sizes = sizes
+            for ingredient_id in ingredient_ids:
+                column = self._columns.get(ingredient_id)
+                if column is None:
+                    self._columns[ingredient_id] = np.array([recipe_id], dtype=np.int32)
+                else:
+                    self._columns[ingredient_id] = np.insert(column, np.searchsorted(column, recipe_id), recipe_id)
+            self._sizes[recipe_id] = len(ingredient_ids)
+
+    def remove(self, recipe_id, previous=None):
+        with self._lock:
+            self._remove(recipe_id, previous)
+
+    def rank(self, pantry_ids, limit=PANTRY_LIMIT):
+        # Возвращает [(recipe_id, matched, missing, score)] по убыванию score, затем matched, затем по id.
+        np = self.np
+        pantry_ids = set(pantry_ids)
+        with self._lock:
+            columns = [self._columns[i] for i in pantry_ids if i in self._columns]
+            sizes = self._sizes
+        if not columns or limit <= 0:
+            return []
+        counts = np.zeros(len(sizes), dtype=np.int16)
+        for column in columns:
+            # В столбце id рецептов уникальны, поэтому обычное индексное сложение корректно.
+            counts[column] += 1
+        candidates = np.flatnonzero(counts)
+        matched = counts[candidates].astype(np.float64)
+        score = matched / (sizes[candidates] + len(pantry_ids) - matched)
+        if len(candidates) > limit:
+            # Порог k-го места находим за линейное время, а равные ему оценки упорядочиваем явно.
+            threshold = np.partition(score, len(score) - limit)[len(score) - limit]
+            keep = np.flatnonzero(score >= threshold)
+            candidates, matched, score = candidates[keep], matched[keep], score[keep]
+        order = np.lexsort((candidates, -matched, -score))[:limit]
+        return [(int(candidates[i]), int(matched[i]), int(sizes[candidates[i]] - matched[i]), float(score[i]))
+                for i in order]
+
+    def _remove(self, recipe_id, previous=None):
+        np = self.np
+        if recipe_id >= len(self._sizes) or not self._sizes[recipe_id]:
+            return
+        if previous is None:
+            columns = list(self._columns.items())
+        else:
+            columns = [(i, self._columns[i]) for i in previous if i in self._columns]
+        for ingredient_id, column in columns:
+            position = np.searchsorted(column, recipe_id)
+            if position < len(column) and column[position] == recipe_id:
+                if len(column) == 1:
+                    del self._columns[ingredient_id]
+                else:
+                    self._columns[ingredient_id] = np.delete(column, position)
+        self._sizes[recipe_id] = 0
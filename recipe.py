@@ -1,13 +1,30 @@
 import sys
 import os
-import threading
-from PyQt6.QtWidgets import (QApplication, QMainWindow, QListWidgetItem, QMessageBox, QDialog, QFileDialog)
-from PyQt6.QtGui import QPixmap
-from PyQt6.QtCore import Qt
-from PyQt6 import uic
-import pyttsx3
-from database import (init_db, get_all_ingredients, get_recipes_by_ingredients, add_recipe,
-                      update_recipe, delete_recipe, get_recipe_by_id, ensure_ingredient_exists)
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QMessageBox, QDialog, QFileDialog, QCompleter,
+                             QPlainTextEdit, QPushButton, QVBoxLayout, QHBoxLayout)
+from PyQt6.QtCore import Qt, QEvent, QStringListModel, QTimer
+from PyQt6.QtGui import QFontDatabase, QKeySequence, QShortcut
+from database import (init_db, enable_recipe_index, get_ingredient_dictionary, get_recipe_names,
+                      cached_ingredient_dictionary,
+                      add_recipe_with_ingredients,
+                      update_recipe_with_ingredients, delete_recipe, get_recipe_by_id, get_cached_recipe,
+                      prefetch_recipes, get_recipe_cache_stats, rank_recipes_by_pantry,
+                      get_recipe_ingredient_ids, check_external_changes, RECIPE_DELETED, RECIPES_RESET)
+from recipe_model import RecipeListModel, RECIPE_ID_ROLE, PAGE_SIZE
+from thumbnails import get_thumbnail_service
+from image_store import ingest_image, resolve_image_path, image_exists, default_image
+from db_worker import get_database_worker
+from ui import setup_form
+from live_search import SearchSession, parse_query, unknown_hints, filter_recipes
+from maintenance import MaintenanceJob, run_idle_step
+import instrumentation
+from instrumentation import timed_slot
+
+SEARCH_DEBOUNCE_MS = 150
+PREFETCH_NEIGHBORS = 3
+MAINTENANCE_CHECK_MS = 30000
+MAINTENANCE_IDLE_SECONDS = 60
+EXTERNAL_CHECK_MS = 5000
 
 
 def resource_path(relative_path):
@@ -18,16 +35,85 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
+def open_database():
+    init_db()
+    enable_recipe_index()
+    get_ingredient_dictionary()
+    # Запоминаем версию базы: дальше check_external_changes заметит записи других процессов (server.py).
+    check_external_changes()
+
+
+_search_session = SearchSession()
+
+
+def find_recipes(text, live=False):
+    # Выполняется в потоке базы данных; сессия поиска живёт там же.
+    recipe_ids, hints = _search_session.find(text, live)
+    return recipe_ids, get_recipe_names(recipe_ids[:PAGE_SIZE]), hints
+
+
+def find_pantry_recipes(text, live=False):
+    # «Что приготовить»: лучшие частичные совпадения, в названии — сколько ингредиентов уже есть.
+    ingredient_ids, unknown = parse_query(text, live)
+    if not ingredient_ids:
+        return find_recipes(text, live)
+    ranked = rank_recipes_by_pantry(ingredient_ids)
+    names = get_recipe_names([recipe_id for recipe_id, *_ in ranked])
+    # Связи, оставшиеся от удалённых рецептов, в список не попадают.
+    labels = {recipe_id: f"{names[recipe_id]} — {matched} из {matched + missing}"
+              for recipe_id, matched, missing, score in ranked if recipe_id in names}
+    return list(labels), labels, unknown_hints(unknown)
+
+
+def check_changed_recipes(query, recipe_ids):
+    # Какие из изменённых рецептов входят в список запроса query и с какой подписью; остальные из списка убираются.
+    text, live, pantry, text_search = query
+    ingredient_ids = parse_query(text, live)[0] if pantry else None
+    if ingredient_ids:
+        pantry_ids = set(ingredient_ids)
+        counts = {recipe_id: (len(ingredients & pantry_ids), len(ingredients))
+                  for recipe_id, ingredients in get_recipe_ingredient_ids(recipe_ids).items()}
+        matching = [recipe_id for recipe_id, (matched, _) in counts.items() if matched]
+        names = get_recipe_names(matching)
+        return {recipe_id: f"{names[recipe_id]} — {counts[recipe_id][0]} из {counts[recipe_id][1]}"
+                for recipe_id in matching if recipe_id in names}
+    return get_recipe_names(filter_recipes(text, recipe_ids, live, text_search))
+
+
+def save_new_recipe(name, instructions, image_path, ing_names):
+    img_path = ingest_image(image_path) if image_path else default_image()
+    return add_recipe_with_ingredients(name, instructions, img_path, ing_names)
+
+
+def save_existing_recipe(recipe_id, name, instructions, image_path, ing_names):
+    update_recipe_with_ingredients(recipe_id, name, instructions, ingest_image(image_path), ing_names)
+    return recipe_id
+
+
 class AddRecipeDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
-        uic.loadUi(resource_path("ui/newrecipe.ui"), self)
+        setup_form(self, "newrecipe")
         self.image_path = ""
+        self.save_request = None
         self.setWindowTitle("Добавить рецепт")
         self.btn_browse.clicked.connect(self.browse_image)
         self.btn_save.clicked.connect(self.save_recipe)
         self.btn_cancel.clicked.connect(self.reject)
 
+    def reset(self):
+        # Диалог создаётся один раз и переиспользуется; перед показом очищаем форму.
+        get_database_worker().cancel(self.save_request)
+        self.save_request = None
+        self.image_path = ""
+        self.lineEdit_name.clear()
+        self.lineEdit_ingredients.clear()
+        self.textEdit_instructions.clear()
+        self.label_preview.clear()
+        self.label_preview.setText("Предпросмотр изображения")
+        self.btn_save.setEnabled(True)
+        self.lineEdit_name.setFocus()
+
     def browse_image(self):
         path, _ = QFileDialog.getOpenFileName(
             self, "Выберите фото блюда", "",
@@ -35,16 +121,9 @@ class AddRecipeDialog(QDialog):
         )
         if path:
             self.image_path = path
-            pixmap = QPixmap(path)
-            scaled_pixmap = pixmap.scaled(
-                self.label_preview.width(),
-                self.label_preview.height(),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.label_preview.setPixmap(scaled_pixmap)
-            self.label_preview.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            get_thumbnail_service().load_into(self.label_preview, path)
 
+    @timed_slot
     def save_recipe(self):
         name = self.lineEdit_name.text().strip()
         instructions = self.textEdit_instructions.toPlainText().strip()
@@ -54,41 +133,50 @@ class AddRecipeDialog(QDialog):
 
         ing_str = self.lineEdit_ingredients.text()
         ing_names = [x.strip() for x in ing_str.split(",") if x.strip()]
-        ing_ids = [ensure_ingredient_exists(name) for name in ing_names]
+        self.btn_save.setEnabled(False)
+        self.save_request = get_database_worker().submit(save_new_recipe, name, instructions, self.image_path,
+                                                         ing_names, callback=self.on_saved,
+                                                         error_callback=self.on_save_failed)
 
-        img_path = self.image_path if self.image_path else resource_path("resources/def.png")
-        add_recipe(name, instructions, img_path, ing_ids)
+    @timed_slot
+    def on_saved(self, recipe_id):
         self.accept()
 
+    def on_save_failed(self, error):
+        self.btn_save.setEnabled(True)
+        QMessageBox.warning(self, "Ошибка", f"Не удалось сохранить рецепт: {error}")
+
 
 class EditRecipeDialog(QDialog):
-    def __init__(self, recipe_data, parent=None):
+    def __init__(self, parent=None):
         super().__init__(parent)
-        uic.loadUi(resource_path("ui/editrecipe.ui"), self)
+        setup_form(self, "editrecipe")
+        self.recipe_data = None
+        self.image_path = ""
+        self.save_request = None
+        self.btn_browse.clicked.connect(self.browse_image)
+        self.btn_save.clicked.connect(self.save_recipe)
+        self.btn_cancel.clicked.connect(self.reject)
+
+    def set_recipe(self, recipe_data):
+        get_database_worker().cancel(self.save_request)
+        self.save_request = None
         self.recipe_data = recipe_data
         self.image_path = recipe_data['image_path']
         self.setWindowTitle(f"Редактировать: {recipe_data['name']}")
+        self.btn_save.setEnabled(True)
         self.load_recipe_data()
-        self.btn_browse.clicked.connect(self.browse_image)
-        self.btn_save.clicked.connect(self.save_recipe)
-        self.btn_cancel.clicked.connect(self.reject)
 
     def load_recipe_data(self):
         self.lineEdit_name.setText(self.recipe_data['name'])
         self.lineEdit_ingredients.setText(", ".join(self.recipe_data['ingredients']))
         self.textEdit_instructions.setPlainText(self.recipe_data['instructions'])
 
-        if os.path.exists(self.image_path):
-            pixmap = QPixmap(self.image_path)
-            scaled_pixmap = pixmap.scaled(
-                self.label_preview.width(),
-                self.label_preview.height(),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.label_preview.setPixmap(scaled_pixmap)
-            self.label_preview.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        preview_path = resolve_image_path(self.image_path)
+        if image_exists(preview_path):
+            get_thumbnail_service().load_into(self.label_preview, preview_path)
         else:
+            self.label_preview.clear()
             self.label_preview.setText("Фото не найдено")
 
     def browse_image(self):
@@ -98,16 +186,9 @@ class EditRecipeDialog(QDialog):
         )
         if path:
             self.image_path = path
-            pixmap = QPixmap(path)
-            scaled_pixmap = pixmap.scaled(
-                self.label_preview.width(),
-                self.label_preview.height(),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.label_preview.setPixmap(scaled_pixmap)
-            self.label_preview.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            get_thumbnail_service().load_into(self.label_preview, path)
 
+    @timed_slot
     def save_recipe(self):
         name = self.lineEdit_name.text().strip()
         instructions = self.textEdit_instructions.toPlainText().strip()
@@ -117,112 +198,273 @@ class EditRecipeDialog(QDialog):
 
         ing_str = self.lineEdit_ingredients.text()
         ing_names = [x.strip() for x in ing_str.split(",") if x.strip()]
-        ing_ids = [ensure_ingredient_exists(name) for name in ing_names]
-
-        update_recipe(self.recipe_data['id'], name, instructions, self.image_path, ing_ids)
+        self.btn_save.setEnabled(False)
+        self.save_request = get_database_worker().submit(save_existing_recipe, self.recipe_data['id'], name,
+                                                         instructions, self.image_path, ing_names,
+                                                         callback=self.on_saved,
+                                                         error_callback=self.on_save_failed)
+
+    @timed_slot
+    def on_saved(self, recipe_id):
         self.accept()
 
+    def on_save_failed(self, error):
+        self.btn_save.setEnabled(True)
+        QMessageBox.warning(self, "Ошибка", f"Не удалось сохранить рецепт: {error}")
+
+
+class ProfilerDialog(QDialog):
+    # Отладочная панель: перцентили по операциям и журнал медленных операций (RECIPE_PROFILE=1).
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Профилирование")
+        self.resize(900, 600)
+        self.text = QPlainTextEdit(self)
+        self.text.setReadOnly(True)
+        self.text.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        btn_refresh = QPushButton("Обновить", self)
+        btn_save = QPushButton("Сохранить JSON", self)
+        btn_reset = QPushButton("Сбросить", self)
+        btn_refresh.clicked.connect(self.refresh)
+        btn_save.clicked.connect(self.save_report)
+        btn_reset.clicked.connect(self.reset)
+        buttons = QHBoxLayout()
+        for button in (btn_refresh, btn_save, btn_reset):
+            buttons.addWidget(button)
+        buttons.addStretch()
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.text)
+        layout.addLayout(buttons)
+
+    def refresh(self):
+        cache = get_recipe_cache_stats()
+        self.text.setPlainText(f"Кэш карточек: {cache['size']}/{cache['capacity']}, попаданий {cache['hits']}, "
+                               f"промахов {cache['misses']} ({cache['hit_rate']:.0%}), "
+                               f"подгружено заранее {cache['prefetched']}\n\n"
+                               + instrumentation.profiler.format_report())
+
+    def save_report(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить отчёт", "profile.json", "JSON (*.json)")
+        if path:
+            instrumentation.profiler.dump(path)
+
+    def reset(self):
+        instrumentation.profiler.reset()
+        self.refresh()
+
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        uic.loadUi(resource_path("ui/main.ui"), self)
+        setup_form(self, "main")
         self.setWindowTitle("Рецепты *Ам-Ням*")
 
-        init_db()
+        self.db = get_database_worker()
+        self.recipe_model = RecipeListModel(self, self.db)
+        self.listView_recipes.setModel(self.recipe_model)
+        self.listView_recipes.setUniformItemSizes(True)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.live_search)
+        self.maintenance = MaintenanceJob()
+        self.maintenance_timer = QTimer(self)
+        self.maintenance_timer.setInterval(MAINTENANCE_CHECK_MS)
+        self.maintenance_timer.timeout.connect(self.run_idle_maintenance)
+        self.external_timer = QTimer(self)
+        self.external_timer.setInterval(EXTERNAL_CHECK_MS)
+        self.external_timer.timeout.connect(self.check_external_changes)
+        # (текст, на лету, «что приготовить», был ли текстовый поиск) — запрос, которым получен список.
+        self.list_query = None
+        self.pending_query = None
+        self.db.recipes_changed.connect(self.on_recipes_changed)
+        self.setup_completer()
         self.setup_connections()
-        self.load_all_recipes()
-
-        self.tts_running = False
+        self.db.submit(open_database, callback=self.on_database_opened, error_callback=self.show_database_error)
+        self.speech = None
+        self.add_dialog = None
+        self.edit_dialog = None
+        self.profiler_dialog = None
+        if instrumentation.profiler is not None:
+            QShortcut(QKeySequence("Ctrl+Shift+P"), self, activated=self.show_profiler)
 
     def setup_connections(self):
         self.btn_search.clicked.connect(self.search_recipes)
         self.btn_add.clicked.connect(self.open_add_dialog)
         self.btn_speak.clicked.connect(self.speak_instructions)
         self.btn_delete.clicked.connect(self.delete_selected_recipe)
-        self.listWidget_recipes.itemClicked.connect(self.load_recipe)
-        self.listWidget_recipes.itemDoubleClicked.connect(self.open_edit_dialog)
-        self.listWidget_recipes.itemDoubleClicked.connect(self.play_recipe_tts)
+        self.listView_recipes.selectionModel().currentChanged.connect(self.load_recipe)
+        self.listView_recipes.doubleClicked.connect(self.open_edit_dialog)
+        self.lineEdit_search.textEdited.connect(self.search_timer.start)
+        self.checkBox_pantry.toggled.connect(self.search_recipes)
+
+    def setup_completer(self):
+        self.completer_model = QStringListModel(self)
+        self.completer = QCompleter(self.completer_model, self)
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.completer.setWidget(self.lineEdit_search)
+        self.completer.activated.connect(self.insert_completion)
+        self.lineEdit_search.textEdited.connect(self.update_completions)
+
+    def update_completions(self, text):
+        prefix = text.split(",")[-1].strip()
+        names = []
+        if prefix:
+            dictionary = cached_ingredient_dictionary()
+            if dictionary is None:
+                # Справочник ещё строится в потоке базы (или сброшен) — подсказки покажем, когда он будет готов.
+                self.db.submit(get_ingredient_dictionary, channel="dictionary",
+                               callback=lambda _: self.update_completions(self.lineEdit_search.text()))
+                return
+            names = dictionary.complete(prefix) or dictionary.suggest(prefix)
+        self.completer_model.setStringList(names)
+        if names:
+            self.completer.complete()
+        else:
+            self.completer.popup().hide()
+
+    def insert_completion(self, name):
+        text = self.lineEdit_search.text()
+        head = text.rsplit(",", 1)[0].strip() if "," in text else ""
+        self.lineEdit_search.setText(f"{head}, {name}" if head else name)
+
+    def show_database_error(self, error):
+        QMessageBox.warning(self, "Ошибка", f"Ошибка базы данных: {error}")
+
+    def on_database_opened(self, _):
+        self.load_all_recipes()
+        self.maintenance_timer.start()
+        self.external_timer.start()
+
+    def check_external_changes(self):
+        # Запись другим процессом сбрасывает кэши в потоке базы и шлёт RECIPES_RESET — список перечитается.
+        self.db.submit(check_external_changes, channel="external", background=True,
+                       error_callback=self.show_database_error)
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if (event.type() == QEvent.Type.ActivationChange and self.isActiveWindow()
+                and self.external_timer.isActive()):
+            self.check_external_changes()
+
+    def run_idle_maintenance(self):
+        # Обслуживание базы — только когда к ней давно не обращались, и короткими шагами.
+        if self.db.idle_seconds() < MAINTENANCE_IDLE_SECONDS or not self.maintenance.due():
+            return
+        self.db.submit(run_idle_step, self.maintenance, channel="maintenance", callback=self.on_maintenance_step)
+
+    def on_maintenance_step(self, report):
+        if report['orphan_links'] or report['unused_ingredients'] or report['reclaimed_pages'] or report['converted']:
+            print(f"[!] Обслуживание базы: связей удалено {report['orphan_links']}, "
+                  f"ингредиентов {report['unused_ingredients']}, освобождено страниц {report['reclaimed_pages']} "
+                  f"за {report['seconds'] * 1000:.0f} мс")
+
+    def run_search(self, text, live=False, pantry=False):
+        # Устаревший запрос вытесняется каналом "list", поэтому ответ всегда на последний pending_query.
+        self.pending_query = (text, live, pantry)
+        self.db.submit(find_pantry_recipes if pantry else find_recipes, text, live, channel="list",
+                       callback=self.show_search_result, error_callback=self.show_database_error)
 
     def load_all_recipes(self):
-        recipes = get_recipes_by_ingredients([])
-        self.display_recipes(recipes)
+        self.run_search("")
 
+    @timed_slot
     def search_recipes(self):
-        text = self.lineEdit_search.text().strip()
-        if not text:
-            self.load_all_recipes()
-            return
+        self.search_timer.stop()
+        self.run_search(self.lineEdit_search.text().strip(), False, self.checkBox_pantry.isChecked())
+
+    @timed_slot
+    def live_search(self):
+        # Поиск на лету после паузы в наборе.
+        self.run_search(self.lineEdit_search.text(), True, self.checkBox_pantry.isChecked())
+
+    @timed_slot
+    def show_search_result(self, result):
+        recipe_ids, names, hints = result
+        # Подсказки значат, что по словам запроса ничего не нашлось и список получен без текстового поиска.
+        self.list_query = self.pending_query + (not hints,)
+        # Тот же объект результата (запрос не изменился по смыслу) — список и выбор не трогаем.
+        if recipe_ids is not self.recipe_model.recipe_ids():
+            self.display_recipes(recipe_ids, names)
+        if hints:
+            self.statusBar().showMessage("; ".join(hints), 8000)
+        else:
+            self.statusBar().clearMessage()
 
-        ing_names = [x.strip().lower() for x in text.split(",") if x.strip()]
-        all_ings = {name.lower(): id for id, name in get_all_ingredients()}
-        ids = [all_ings[name] for name in ing_names if name in all_ings]
-        recipes = get_recipes_by_ingredients(ids)
-        self.display_recipes(recipes)
-
-    def display_recipes(self, recipes):
-        self.listWidget_recipes.clear()
-        for rec in recipes:
-            item = QListWidgetItem(rec[1])
-            item.setData(Qt.ItemDataRole.UserRole, rec)
-            self.listWidget_recipes.addItem(item)
-
-    def load_recipe(self, item):
-        rec = item.data(Qt.ItemDataRole.UserRole)
-        self.textEdit_instructions.setPlainText(rec[2] or "")
-        img_path = rec[3] or resource_path("resources/def.png")
-        if not os.path.exists(img_path):
+    @timed_slot
+    def display_recipes(self, recipe_ids, names=None):
+        self.recipe_model.set_recipe_ids(recipe_ids, names)
+        self.clear_recipe_details()
+
+    def clear_recipe_details(self):
+        self.textEdit_instructions.clear()
+        self.listWidget_ingredients.clear()
+        self.label_image.clear()
+        self.label_image.setText("Фото блюда")
+
+    @timed_slot
+    def load_recipe(self, index, previous=None):
+        if not index.isValid():
+            self.clear_recipe_details()
+            return
+        recipe_data = get_cached_recipe(index.data(RECIPE_ID_ROLE))
+        if recipe_data is not None:
+            self.show_recipe_details(recipe_data)
+        else:
+            self.db.submit(get_recipe_by_id, index.data(RECIPE_ID_ROLE), channel="detail",
+                           callback=self.show_recipe_details, error_callback=self.show_database_error)
+        self.prefetch_neighbors(index.row())
+
+    def prefetch_neighbors(self, row):
+        # Соседи по списку подгружаются заранее, чтобы листание стрелками шло из кэша.
+        neighbors = self.recipe_model.neighbor_ids(row, PREFETCH_NEIGHBORS)
+        if neighbors:
+            self.db.submit(prefetch_recipes, neighbors, channel="prefetch")
+
+    @timed_slot
+    def show_recipe_details(self, recipe_data):
+        current = self.listView_recipes.currentIndex()
+        if not recipe_data or not current.isValid() or current.data(RECIPE_ID_ROLE) != recipe_data['id']:
+            return
+        self.textEdit_instructions.setPlainText(recipe_data['instructions'] or "")
+        img_path = resolve_image_path(recipe_data['image_path']) or resource_path("resources/def.png")
+        if not image_exists(img_path):
             img_path = resource_path("resources/def.png")
-        pixmap = QPixmap(img_path)
-        scaled_pixmap = pixmap.scaled(
-            self.label_image.width(),
-            self.label_image.height(),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        self.label_image.setPixmap(scaled_pixmap)
-        self.label_image.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        get_thumbnail_service().load_into(self.label_image, img_path)
 
         self.listWidget_ingredients.clear()
-        recipe_id = rec[0]
-        recipe_data = get_recipe_by_id(recipe_id)
-        if recipe_data:
-            ingredients = recipe_data['ingredients']
-            for ingredient in ingredients:
-                self.listWidget_ingredients.addItem(ingredient)
+        self.listWidget_ingredients.addItems(recipe_data['ingredients'])
 
     def open_add_dialog(self):
-        dialog = AddRecipeDialog(self)
-        if dialog.exec() == QDialog.DialogCode.Accepted:
-            self.load_all_recipes()
-
-    def open_edit_dialog(self, item):
-        rec = item.data(Qt.ItemDataRole.UserRole)
-        recipe_id = rec[0]
-        recipe_data = get_recipe_by_id(recipe_id)
+        if self.add_dialog is None:
+            self.add_dialog = AddRecipeDialog(self)
+        self.add_dialog.reset()
+        self.add_dialog.exec()
+
+    def open_edit_dialog(self, index):
+        self.db.submit(get_recipe_by_id, index.data(RECIPE_ID_ROLE), channel="edit",
+                       callback=self.show_edit_dialog, error_callback=self.show_database_error)
+
+    @timed_slot
+    def show_edit_dialog(self, recipe_data):
         if recipe_data:
-            self.listWidget_recipes.itemDoubleClicked.disconnect(self.play_recipe_tts)
-
-            dialog = EditRecipeDialog(recipe_data, self)
-            if dialog.exec() == QDialog.DialogCode.Accepted:
-                self.load_all_recipes()
-                self.textEdit_instructions.clear()
-                self.listWidget_ingredients.clear()
-                self.label_image.clear()
-                self.label_image.setText("Фото блюда")
-            self.listWidget_recipes.itemDoubleClicked.connect(self.play_recipe_tts)
+            if self.edit_dialog is None:
+                self.edit_dialog = EditRecipeDialog(self)
+            self.edit_dialog.set_recipe(recipe_data)
+            self.edit_dialog.exec()
         else:
             QMessageBox.warning(self, "Ошибка", "Не удалось загрузить данные рецепта для редактирования.")
 
+    @timed_slot
     def delete_selected_recipe(self):
-        item = self.listWidget_recipes.currentItem()
-        if not item:
+        index = self.listView_recipes.currentIndex()
+        if not index.isValid():
             QMessageBox.warning(self, "Ошибка", "Сначала выберите рецепт для удаления.")
             return
 
-        rec = item.data(Qt.ItemDataRole.UserRole)
-        recipe_id = rec[0]
-        recipe_name = rec[1]
+        recipe_id = index.data(RECIPE_ID_ROLE)
+        recipe_name = index.data(Qt.ItemDataRole.DisplayRole)
 
         reply = QMessageBox.question(
             self, "Подтверждение", f"Вы уверены, что хотите удалить рецепт '{recipe_name}'?",
@@ -230,67 +472,73 @@ class MainWindow(QMainWindow):
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            delete_recipe(recipe_id)
-            self.load_all_recipes()
-            self.textEdit_instructions.clear()
-            self.listWidget_ingredients.clear()
-            self.label_image.clear()
-            self.label_image.setText("Фото блюда")
-
-    def _speak_with_new_engine(self, text):
-        engine = pyttsx3.init()
-        engine.setProperty('rate', 220)
-        engine.setProperty('volume', 0.9)
-
-        voices = engine.getProperty('voices')
-        for voice in voices:
-            if 'david' in voice.name.lower() or 'male' in voice.name.lower():
-                engine.setProperty('voice', voice.id)
-                print(f"[DEBUG] В потоке установлен голос: {voice.name}")
-                break
-        else:
-            if voices:
-                engine.setProperty('voice', voices[0].id)
-                print(f"[!] В потоке установлен первый доступный голос: {voices[0].name}")
-
-        engine.say(text)
-        engine.runAndWait()
+            self.db.submit(delete_recipe, recipe_id, error_callback=self.show_database_error)
 
-    def play_recipe_tts(self, item):
-        if self.tts_running:
-            print("[!] Озвучка уже запущена, пропускаем новый запуск.")
+    @timed_slot
+    def on_recipes_changed(self, kind, recipe_ids):
+        # Список правится по строкам: запрос, выбор и прокрутка остаются как были.
+        if self.list_query is None:
             return
-
-        rec = item.data(Qt.ItemDataRole.UserRole)
-        instructions = (rec[2] or "").strip()
-        if not instructions:
+        if kind == RECIPES_RESET:
+            self.run_search(*self.list_query[:3])
+        elif kind == RECIPE_DELETED:
+            for recipe_id in recipe_ids:
+                self.recipe_model.remove_recipe(recipe_id)
+        else:
+            self.check_changed_recipes(recipe_ids)
+
+    def check_changed_recipes(self, recipe_ids):
+        query = self.list_query
+        self.db.submit(check_changed_recipes, query, recipe_ids,
+                       callback=lambda labels: self.apply_changed_recipes(query, recipe_ids, labels),
+                       error_callback=self.show_database_error)
+
+    @timed_slot
+    def apply_changed_recipes(self, query, recipe_ids, labels):
+        if query is not self.list_query:
+            # Пока шла проверка, пришёл результат другого запроса — проверяем под него.
+            self.check_changed_recipes(recipe_ids)
             return
-
-        self.tts_running = True
-        print("[!] Запускаю _speak_with_new_engine в отдельном потоке...")
-        def _run():
-            self._speak_with_new_engine(instructions)
-            self.tts_running = False
-            print("[!] _speak_with_new_engine завершён, флаг сброшен.")
-        threading.Thread(target=_run, daemon=True).start()
+        for recipe_id in recipe_ids:
+            if recipe_id in labels:
+                self.recipe_model.set_recipe(recipe_id, labels[recipe_id])
+            else:
+                self.recipe_model.remove_recipe(recipe_id)
+        current = self.listView_recipes.currentIndex()
+        if current.isValid() and current.data(RECIPE_ID_ROLE) in recipe_ids:
+            self.load_recipe(current)
+
+    def show_profiler(self):
+        if self.profiler_dialog is None:
+            self.profiler_dialog = ProfilerDialog(self)
+        self.profiler_dialog.refresh()
+        self.profiler_dialog.show()
+        self.profiler_dialog.raise_()
+
+    def speech_service(self):
+        # Модуль озвучки и его поток поднимаются только при первой озвучке.
+        if self.speech is None:
+            from tts import get_speech_service
+            self.speech = get_speech_service()
+        return self.speech
 
     def speak_instructions(self):
-        if self.tts_running:
-            print("[!] Озвучка уже запущена, пропускаем новый запуск.")
+        if self.speech is not None and self.speech.is_busy():
+            print("[!] Останавливаю озвучку.")
+            self.speech.stop()
             return
 
         text = self.textEdit_instructions.toPlainText().strip()
         if not text:
             QMessageBox.warning(self, "Ошибка", "Нет текста для озвучки.")
             return
+        self.speak_text(text)
 
-        self.tts_running = True
-        print("[!] Запускаю _speak_with_new_engine для кнопки в отдельном потоке...")
-        def _run():
-            self._speak_with_new_engine(text)
-            self.tts_running = False
-            print("[!] _speak_with_new_engine завершён, флаг сброшен.")
-        threading.Thread(target=_run, daemon=True).start()
+    def speak_text(self, text):
+        # Новая озвучка заменяет текущую, а не ждёт её окончания.
+        speech = self.speech_service()
+        speech.stop()
+        speech.speak(text)
 
     def keyPressEvent(self, event):
         if event.key() in (Qt.Key.Key_Enter, Qt.Key.Key_Return):
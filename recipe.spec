@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('ui', 'ui'), ('resources', 'resources'), ('recipes.db', '.')],
-    hiddenimports=['pyttsx3', 'sip'],
+    hiddenimports=['pyttsx3', 'sip', 'ui.main_ui', 'ui.newrecipe_ui', 'ui.editrecipe_ui', 'numpy'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
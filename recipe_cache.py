@@ -0,0 +1,113 @@
+import threading
+from collections import OrderedDict
+
+RECIPE_CACHE_SIZE = 512
+
+
+class RecipeCache:
+    # LRU карточек рецептов: recipe_id -> {'id', 'name', 'instructions', 'image_path', 'ingredients'}.
+    def __init__(self, capacity=RECIPE_CACHE_SIZE):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.prefetched = 0
+        self._items = OrderedDict()
+        self._by_ingredient = {}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def token(self):
+        # Запоминается до чтения из базы: если между чтением и put была запись, результат не кэшируем.
+        with self._lock:
+            return self._version
+
+    def get(self, recipe_id, count_miss=True):
+        with self._lock:
+            entry = self._items.get(recipe_id)
+            if entry is None:
+                if count_miss:
+                    self.misses += 1
+                return None
+            self._items.move_to_end(recipe_id)
+            self.hits += 1
+        return self._copy(entry)
+
+    def missing(self, recipe_ids):
+        with self._lock:
+            return [recipe_id for recipe_id in recipe_ids if recipe_id not in self._items]
+
+    def put(self, detail, ingredient_ids, token, prefetched=False):
+        recipe_id = detail['id']
+        with self._lock:
+            if token != self._version:
+                return False
+            self._remove(recipe_id)
+            self._items[recipe_id] = (detail, tuple(ingredient_ids))
+            for ingredient_id in ingredient_ids:
+                self._by_ingredient.setdefault(ingredient_id, set()).add(recipe_id)
+            if prefetched:
+                self.prefetched += 1
+            while len(self._items) > self.capacity:
+                self._remove(next(iter(self._items)))
+                self.evictions += 1
+        return True
+
+    def invalidate(self, recipe_ids):
+        with self._lock:
+            self._version += 1
+            for recipe_id in recipe_ids:
+                if self._remove(recipe_id):
+                    self.invalidations += 1
+
+    def invalidate_ingredients(self, ingredient_ids):
+        with self._lock:
+            self._version += 1
+            for ingredient_id in ingredient_ids:
+                for recipe_id in list(self._by_ingredient.get(ingredient_id, ())):
+                    if self._remove(recipe_id):
+                        self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._items.clear()
+            self._by_ingredient.clear()
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'size': len(self._items),
+                'capacity': self.capacity,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'prefetched': self.prefetched,
+            }
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, recipe_id):
+        return recipe_id in self._items
+
+    def _remove(self, recipe_id):
+        entry = self._items.pop(recipe_id, None)
+        if entry is None:
+            return False
+        for ingredient_id in entry[1]:
+            recipes = self._by_ingredient.get(ingredient_id)
+            if recipes is not None:
+                recipes.discard(recipe_id)
+                if not recipes:
+                    del self._by_ingredient[ingredient_id]
+        return True
+
+    @staticmethod
+    def _copy(entry):
+        detail = entry[0]
+        return dict(detail, ingredients=list(detail['ingredients']))
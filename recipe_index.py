@@ -0,0 +1,198 @@
+import threading
+from collections.abc import Sequence
+
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256))
+
+
+def mask_to_ids(mask):
+    ids = []
+    if not mask:
+        return ids
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    for byte_index, byte in enumerate(data):
+        if byte:
+            base = byte_index * 8
+            ids.extend(base + bit for bit in _BYTE_BITS[byte])
+    return ids
+
+
+class MaskIds(Sequence):
+    # Отсортированные id из маски, раскодируемые по мере обращения: списку на экране нужна только первая страница.
+    DECODE_BYTES = 256
+
+    def __init__(self, mask):
+        self.mask = mask
+        self._data = mask.to_bytes((mask.bit_length() + 7) // 8, "little") if mask else b""
+        self._decoded = []
+        self._offset = 0
+        self._length = mask.bit_count()
+        # Один и тот же результат читают поток базы и GUI-поток.
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            stop = index.stop
+            if stop is None or stop < 0 or (index.start or 0) < 0:
+                stop = self._length
+            self._decode_until(stop)
+            return self._decoded[index]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        self._decode_until(index + 1)
+        return self._decoded[index]
+
+    def __iter__(self):
+        position = 0
+        while position < self._length:
+            self._decode_until(position + 1)
+            yield from self._decoded[position:]
+            position = len(self._decoded)
+
+    def __contains__(self, recipe_id):
+        return isinstance(recipe_id, int) and recipe_id >= 0 and bool(self.mask >> recipe_id & 1)
+
+    def _decode_until(self, count):
+        if len(self._decoded) >= count:
+            return
+        with self._lock:
+            self._decode_locked(count)
+
+    def _decode_locked(self, count):
+        data = self._data
+        while len(self._decoded) < count and self._offset < len(data):
+            end = min(self._offset + self.DECODE_BYTES, len(data))
+            for byte_index in range(self._offset, end):
+                byte = data[byte_index]
+                if byte:
+                    base = byte_index * 8
+                    self._decoded.extend(base + bit for bit in _BYTE_BITS[byte])
+            self._offset = end
+
+
+def ids_to_mask(ids):
+    ids = list(ids)
+    if not ids:
+        return 0
+    data = bytearray(max(ids) // 8 + 1)
+    for recipe_id in ids:
+        data[recipe_id >> 3] |= 1 << (recipe_id & 7)
+    return int.from_bytes(data, "little")
+
+
+class RecipeIndex:
+    # Инвертированный индекс: ingredient_id -> битовая маска id рецептов.
+    def __init__(self):
+        self._postings = {}
+        self._counts = {}
+        self._recipes = {}
+        self._all = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, recipe_ids, links):
+        index = cls()
+        index._recipes = {recipe_id: set() for recipe_id in recipe_ids}
+        by_ingredient = {}
+        for recipe_id, ingredient_id in links:
+            if recipe_id in index._recipes:
+                index._recipes[recipe_id].add(ingredient_id)
+                by_ingredient.setdefault(ingredient_id, []).append(recipe_id)
+        for ingredient_id, ids in by_ingredient.items():
+            index._postings[ingredient_id] = ids_to_mask(ids)
+            index._counts[ingredient_id] = len(set(ids))
+        index._all = ids_to_mask(index._recipes)
+        index._recipes = {recipe_id: frozenset(ids) for recipe_id, ids in index._recipes.items()}
+        return index
+
+    def __len__(self):
+        return len(self._recipes)
+
+    def __contains__(self, recipe_id):
+        return recipe_id in self._recipes
+
+    def ingredients_of(self, recipe_id):
+        return self._recipes.get(recipe_id, frozenset())
+
+    def recipe_count(self, ingredient_id):
+        return self._counts.get(ingredient_id, 0)
+
+    def add(self, recipe_id, ingredient_ids):
+        with self._lock:
+            self._remove(recipe_id)
+            self._add(recipe_id, frozenset(ingredient_ids))
+
+    def update(self, recipe_id, ingredient_ids):
+        ingredient_ids = frozenset(ingredient_ids)
+        with self._lock:
+            if recipe_id not in self._recipes:
+                self._add(recipe_id, ingredient_ids)
+                return
+            old = self._recipes[recipe_id]
+            bit = 1 << recipe_id
+            for ingredient_id in old - ingredient_ids:
+                self._clear_bit(ingredient_id, bit)
+            for ingredient_id in ingredient_ids - old:
+                self._set_bit(ingredient_id, bit)
+            self._recipes[recipe_id] = ingredient_ids
+
+    def remove(self, recipe_id):
+        with self._lock:
+            self._remove(recipe_id)
+
+    def all_of(self, ingredient_ids):
+        return mask_to_ids(self.mask_of(ingredient_ids))
+
+    def mask_of(self, ingredient_ids, base=None):
+        # base — маска уже найденных рецептов: её только сужаем недостающими ингредиентами.
+        ingredient_ids = set(ingredient_ids)
+        with self._lock:
+            mask = self._all if base is None else base & self._all
+            if any(ingredient_id not in self._postings for ingredient_id in ingredient_ids):
+                return 0
+            # Пересекаем, начиная с самого редкого ингредиента.
+            for ingredient_id in sorted(ingredient_ids, key=self._counts.__getitem__):
+                mask &= self._postings[ingredient_id]
+                if not mask:
+                    return 0
+        return mask
+
+    def filter(self, recipe_ids, ingredient_ids):
+        ingredient_ids = frozenset(ingredient_ids)
+        with self._lock:
+            return [recipe_id for recipe_id in recipe_ids
+                    if ingredient_ids <= self._recipes.get(recipe_id, frozenset())]
+
+    def _add(self, recipe_id, ingredient_ids):
+        bit = 1 << recipe_id
+        for ingredient_id in ingredient_ids:
+            self._set_bit(ingredient_id, bit)
+        self._recipes[recipe_id] = ingredient_ids
+        self._all |= bit
+
+    def _remove(self, recipe_id):
+        old = self._recipes.pop(recipe_id, None)
+        if old is None:
+            return
+        bit = 1 << recipe_id
+        for ingredient_id in old:
+            self._clear_bit(ingredient_id, bit)
+        self._all &= ~bit
+
+    def _set_bit(self, ingredient_id, bit):
+        self._postings[ingredient_id] = self._postings.get(ingredient_id, 0) | bit
+        self._counts[ingredient_id] = self._counts.get(ingredient_id, 0) + 1
+
+    def _clear_bit(self, ingredient_id, bit):
+        mask = self._postings.get(ingredient_id, 0) & ~bit
+        count = self._counts.get(ingredient_id, 0) - 1
+        if mask:
+            self._postings[ingredient_id] = mask
+            self._counts[ingredient_id] = count
+        else:
+            self._postings.pop(ingredient_id, None)
+            self._counts.pop(ingredient_id, None)
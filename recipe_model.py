@@ -0,0 +1,210 @@
+from collections.abc import Sequence
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex
+from database import get_recipe_names
+from db_worker import get_database_worker
+from recipe_index import MaskIds
+
+RECIPE_ID_ROLE = Qt.ItemDataRole.UserRole
+PAGE_SIZE = 200
+
+
+class RecipeListModel(QAbstractListModel):
+    # Список хранит только id; названия подгружаются страницами по мере прокрутки, запросом в потоке базы.
+    # Правки после записи меняют отдельные строки поверх результата поиска, сам результат не копируется:
+    # его читает и поток базы, а MaskIds раскодируется лениво.
+    def __init__(self, parent=None, worker=None):
+        super().__init__(parent)
+        self.db = worker or get_database_worker()
+        self._generation = 0
+        self._fetching = None
+        self._ids = []
+        self._id_set = None
+        self._rows = []
+        self._row_of = {}
+        self._exact_rows = 0
+        self._names = []
+        self._next = 0
+        self._removed = set()
+        self._dropped = set()
+        self._appended = {}
+
+    def set_recipe_ids(self, recipe_ids, names=None):
+        self.beginResetModel()
+        # Ответ на запрос страницы для прежнего результата будет отброшен.
+        self._generation += 1
+        self._fetching = None
+        self._ids = recipe_ids if isinstance(recipe_ids, Sequence) else list(recipe_ids)
+        self._id_set = None
+        self._rows = []
+        self._row_of = {}
+        self._exact_rows = 0
+        self._names = []
+        self._next = 0
+        self._removed = set()
+        self._dropped = set()
+        # Добавленные после поиска id по порядку добавления (dict — упорядоченное множество).
+        self._appended = {}
+        if names:
+            # Первая страница уже загружена вместе с результатом поиска.
+            page = list(self._ids[:PAGE_SIZE])
+            self._next = len(page)
+            self._extend_rows(page, [names.get(recipe_id, "") for recipe_id in page])
+        self.endResetModel()
+        if not self._rows:
+            self.fetchMore(QModelIndex())
+
+    def recipe_ids(self):
+        return self._ids
+
+    def recipe_id(self, row):
+        if 0 <= row < len(self._rows):
+            return self._rows[row]
+        return None
+
+    def row_of(self, recipe_id):
+        # Номера в _row_of точны для первых _exact_rows строк; после удаления строки номера ниже неё
+        # завышены и пересчитываются здесь — только до искомой строки.
+        row = self._row_of.get(recipe_id)
+        if row is None:
+            return -1
+        if row < self._exact_rows:
+            return row
+        for row in range(self._exact_rows, len(self._rows)):
+            other_id = self._rows[row]
+            self._row_of[other_id] = row
+            if other_id == recipe_id:
+                self._exact_rows = row + 1
+                return row
+        return -1
+
+    def neighbor_ids(self, row, count):
+        return self._rows[max(0, row - count):row] + self._rows[row + 1:row + 1 + count]
+
+    def set_recipe(self, recipe_id, name):
+        # Рецепт добавлен или изменён и подходит под текущий запрос: обновляем строку или добавляем новую в конец.
+        row = self.row_of(recipe_id)
+        if row >= 0:
+            self._names[row] = name
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+        elif recipe_id in self._removed:
+            self._removed.discard(recipe_id)
+        elif recipe_id in self._appended or self._loading(recipe_id) or self._pending(recipe_id):
+            return
+        elif self._has_more():
+            # Сначала должны показаться ещё не загруженные строки результата.
+            self._dropped.discard(recipe_id)
+            self._appended[recipe_id] = None
+        else:
+            self._dropped.discard(recipe_id)
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows))
+            self._extend_rows([recipe_id], [name])
+            self.endInsertRows()
+
+    def remove_recipe(self, recipe_id):
+        row = self.row_of(recipe_id)
+        if row >= 0:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._rows[row]
+            del self._names[row]
+            del self._row_of[recipe_id]
+            self._exact_rows = min(self._exact_rows, row)
+            self.endRemoveRows()
+            if self._in_result(recipe_id):
+                self._dropped.add(recipe_id)
+        elif recipe_id in self._appended:
+            del self._appended[recipe_id]
+        elif self._loading(recipe_id) or self._pending(recipe_id):
+            self._removed.add(recipe_id)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def canFetchMore(self, parent):
+        if parent.isValid() or self._fetching is not None:
+            return False
+        return self._has_more()
+
+    def fetchMore(self, parent):
+        if parent.isValid() or self._fetching is not None:
+            return
+        page = []
+        while not page and self._has_more():
+            page = self._skip_removed(self._ids[self._next:self._next + PAGE_SIZE])
+            self._next = min(self._next + PAGE_SIZE, len(self._ids))
+            if self._next >= len(self._ids):
+                page += list(self._appended)
+                self._appended = {}
+        if not page:
+            return
+        generation = self._generation
+        self._fetching = set(page)
+        self.db.submit(get_recipe_names, page, callback=lambda names: self._insert_page(generation, page, names),
+                       error_callback=lambda error: self._page_failed(generation))
+
+    def _insert_page(self, generation, page, names):
+        if generation != self._generation:
+            return
+        self._fetching = None
+        # Пока страница грузилась, часть рецептов могла быть удалена.
+        page = self._skip_removed(page)
+        if not page:
+            return
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(page) - 1)
+        self._extend_rows(page, [names.get(recipe_id, "") for recipe_id in page])
+        self.endInsertRows()
+
+    def _page_failed(self, generation):
+        if generation == self._generation:
+            self._fetching = None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._names[index.row()]
+        if role == RECIPE_ID_ROLE:
+            return self._rows[index.row()]
+        return None
+
+    def _skip_removed(self, recipe_ids):
+        # Удалённые id пропускаются и становятся «выбывшими»: если рецепт снова подойдёт, set_recipe его добавит.
+        page = []
+        for recipe_id in recipe_ids:
+            if recipe_id not in self._removed:
+                page.append(recipe_id)
+                continue
+            self._removed.discard(recipe_id)
+            if self._in_result(recipe_id):
+                self._dropped.add(recipe_id)
+        return page
+
+    def _loading(self, recipe_id):
+        return self._fetching is not None and recipe_id in self._fetching
+
+    def _has_more(self):
+        return self._next < len(self._ids) or bool(self._appended) or self._fetching is not None
+
+    def _extend_rows(self, recipe_ids, names):
+        exact = self._exact_rows == len(self._rows)
+        for row, recipe_id in enumerate(recipe_ids, start=len(self._rows)):
+            self._row_of[recipe_id] = row
+        self._rows.extend(recipe_ids)
+        if exact:
+            self._exact_rows = len(self._rows)
+        self._names.extend(names)
+
+    def _in_result(self, recipe_id):
+        # MaskIds проверяется по маске, без раскодирования; для списка множество строится один раз.
+        if isinstance(self._ids, MaskIds):
+            return recipe_id in self._ids
+        if self._id_set is None:
+            self._id_set = set(self._ids)
+        return recipe_id in self._id_set
+
+    def _pending(self, recipe_id):
+        # Есть в ещё не загруженной части результата: загруженные id либо в строках, либо в _dropped.
+        return recipe_id not in self._dropped and self._in_result(recipe_id)
@@ -0,0 +1,300 @@
+import argparse
+import hashlib
+import json
+import re
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import database
+from live_search import SearchSession, parse_query, unknown_hints
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 16
+KEEPALIVE_TIMEOUT = 5
+EXTERNAL_CHECK_INTERVAL = 1.0
+MAX_BODY_SIZE = 1024 * 1024
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+RECIPE_PATH = re.compile(r"^/recipes/(\d+)$")
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+_sessions = threading.local()
+
+
+def search_session():
+    # SearchSession не потокобезопасна: у каждого потока пула своя, со своим кэшем результатов.
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = _sessions.session = SearchSession()
+    return session
+
+
+def search(text, limit=DEFAULT_LIMIT, offset=0, pantry=False):
+    if pantry:
+        ingredient_ids, unknown = parse_query(text)
+        if ingredient_ids:
+            ranked = database.rank_recipes_by_pantry(ingredient_ids, offset + limit)[offset:]
+            names = database.get_recipe_names([recipe_id for recipe_id, *_ in ranked])
+            return {
+                "recipes": [{"id": recipe_id, "name": names[recipe_id], "matched": matched, "missing": missing,
+                             "score": round(score, 4)}
+                            for recipe_id, matched, missing, score in ranked if recipe_id in names],
+                "hints": unknown_hints(unknown),
+            }
+    recipe_ids, hints = search_session().find(text)
+    page = recipe_ids[offset:offset + limit]
+    names = database.get_recipe_names(page)
+    return {
+        "total": len(recipe_ids),
+        "recipes": [{"id": recipe_id, "name": names.get(recipe_id, "")} for recipe_id in page],
+        "hints": hints,
+    }
+
+
+def recipe_fields(payload, current=None):
+    if not isinstance(payload, dict):
+        raise ApiError(400, "ожидается JSON-объект")
+    current = current or {}
+    name = payload.get("name", current.get("name"))
+    if not isinstance(name, str) or not name.strip():
+        raise ApiError(400, "не указано название рецепта")
+    instructions = payload.get("instructions", current.get("instructions", ""))
+    image_path = payload.get("image_path", current.get("image_path")) or database.DEFAULT_IMAGE
+    ingredients = payload.get("ingredients", current.get("ingredients", []))
+    if not isinstance(instructions, str) or not isinstance(image_path, str):
+        raise ApiError(400, "instructions и image_path должны быть строками")
+    if not isinstance(ingredients, list) or not all(isinstance(name, str) for name in ingredients):
+        raise ApiError(400, "ingredients должен быть списком строк")
+    return name.strip(), instructions, image_path, ingredients
+
+
+def add_recipe(payload):
+    recipe_id = database.add_recipe_with_ingredients(*recipe_fields(payload))
+    return database.get_recipe_by_id(recipe_id)
+
+
+def update_recipe(recipe_id, payload):
+    current = database.get_recipe_by_id(recipe_id)
+    if current is None:
+        return None
+    database.update_recipe_with_ingredients(recipe_id, *recipe_fields(payload, current))
+    return database.get_recipe_by_id(recipe_id)
+
+
+def delete_recipe(recipe_id):
+    if database.get_recipe_by_id(recipe_id) is None:
+        return False
+    database.delete_recipe(recipe_id)
+    return True
+
+
+class RecipeRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1: соединение остаётся открытым между запросами, пока клиент не закроет его или не замолчит.
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_TIMEOUT
+    # Заголовки и тело уходят отдельными записями: с Nagle ответ ждал бы отложенный ACK клиента (~40 мс).
+    disable_nagle_algorithm = True
+    server_version = "RecipeServer/1.0"
+
+    def do_GET(self):
+        self.dispatch(self.handle_get)
+
+    def do_POST(self):
+        self.dispatch(self.handle_post)
+
+    def do_PUT(self):
+        self.dispatch(self.handle_put)
+
+    def do_DELETE(self):
+        self.dispatch(self.handle_delete)
+
+    def dispatch(self, handler):
+        url = urlsplit(self.path)
+        try:
+            # Тело читаем всегда, иначе его остаток сломает следующий запрос в том же соединении.
+            body = self.read_body()
+            handler(url.path.rstrip("/") or "/", parse_qs(url.query), body)
+        except ApiError as e:
+            self.send_json({"error": str(e)}, e.status)
+        except Exception as e:
+            traceback.print_exc()
+            self.send_json({"error": f"{type(e).__name__}: {e}"}, 500)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_SIZE:
+            self.close_connection = True
+            raise ApiError(413, "слишком большой запрос")
+        return self.rfile.read(length) if length else b""
+
+    def handle_get(self, path, query, body):
+        if path == "/recipes":
+            limit = min(int_param(query, "limit", DEFAULT_LIMIT), MAX_LIMIT)
+            offset = int_param(query, "offset", 0)
+            pantry = query.get("mode", [""])[0] == "pantry"
+            return self.send_json(search(query.get("q", [""])[0], limit, offset, pantry), etag=True)
+        recipe_id = match_recipe_id(path)
+        recipe = database.get_recipe_by_id(recipe_id)
+        if recipe is None:
+            raise ApiError(404, f"рецепт {recipe_id} не найден")
+        self.send_json(recipe, etag=True)
+
+    def handle_post(self, path, query, body):
+        if path != "/recipes":
+            raise ApiError(404, "неизвестный адрес")
+        self.send_json(self.server.write(add_recipe, parse_json(body)), 201)
+
+    def handle_put(self, path, query, body):
+        recipe_id = match_recipe_id(path)
+        recipe = self.server.write(update_recipe, recipe_id, parse_json(body))
+        if recipe is None:
+            raise ApiError(404, f"рецепт {recipe_id} не найден")
+        self.send_json(recipe)
+
+    def handle_delete(self, path, query, body):
+        recipe_id = match_recipe_id(path)
+        if not self.server.write(delete_recipe, recipe_id):
+            raise ApiError(404, f"рецепт {recipe_id} не найден")
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def send_json(self, payload, status=200, etag=False):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        tag = None
+        if etag:
+            # ETag по содержимому: неизменённый рецепт даёт тот же тег и после перезапуска сервера.
+            tag = '"' + hashlib.sha1(data).hexdigest()[:20] + '"'
+            if tag in parse_etags(self.headers.get("If-None-Match", "")):
+                self.send_response(304)
+                self.send_header("ETag", tag)
+                self.end_headers()
+                return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if tag:
+            self.send_header("ETag", tag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def int_param(query, name, default):
+    try:
+        value = int(query.get(name, [default])[0])
+    except ValueError:
+        raise ApiError(400, f"{name} должен быть числом")
+    if value < 0:
+        raise ApiError(400, f"{name} не может быть отрицательным")
+    return value
+
+
+def match_recipe_id(path):
+    match = RECIPE_PATH.match(path)
+    if match is None:
+        raise ApiError(404, "неизвестный адрес")
+    return int(match.group(1))
+
+
+def parse_json(body):
+    try:
+        return json.loads(body or b"null")
+    except ValueError:
+        raise ApiError(400, "некорректный JSON")
+
+
+def parse_etags(header):
+    return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+
+class RecipeServer(HTTPServer):
+    # Чтение — в пуле потоков, у каждого своё соединение (WAL не блокирует читателей);
+    # все записи идут через один поток, так что писатель в процессе всегда один.
+    def __init__(self, address, workers=DEFAULT_WORKERS, verbose=False):
+        super().__init__(address, RecipeRequestHandler)
+        self.verbose = verbose
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="recipe-reader")
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix="recipe-writer")
+        self._stopped = threading.Event()
+        self._watcher = threading.Thread(target=self._watch_external_changes, name="recipe-watcher", daemon=True)
+        self._watcher.start()
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def write(self, func, *args):
+        return self.writer.submit(func, *args).result()
+
+    def _watch_external_changes(self):
+        # Запись из окна приложения или другого сервера замечаем с задержкой не больше интервала.
+        while True:
+            self.writer.submit(database.check_external_changes)
+            if self._stopped.wait(EXTERNAL_CHECK_INTERVAL):
+                break
+
+    def server_close(self):
+        self._stopped.set()
+        self._watcher.join()
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.writer.shutdown()
+        database.close_all_connections()
+
+
+def open_database():
+    # Всё, что окно строит лениво, сервер готовит сразу: первый запрос не должен ждать построения.
+    database.init_db()
+    database.enable_recipe_index()
+    database.get_ingredient_dictionary()
+    database.get_pantry_matrix()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON-сервер каталога рецептов без окна")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="потоков чтения; каждое keep-alive соединение занимает поток, пока открыто")
+    parser.add_argument("--db", help="путь к базе (по умолчанию recipes.db рядом с программой)")
+    parser.add_argument("--verbose", action="store_true", help="писать каждый запрос в лог")
+    args = parser.parse_args()
+    if args.db:
+        database.DB_PATH = args.db
+    open_database()
+    server = RecipeServer((args.host, args.port), args.workers, args.verbose)
+    print(f"[!] Сервер рецептов: http://{args.host}:{server.server_address[1]}/recipes", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
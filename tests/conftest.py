@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+
+def reset_caches():
+    database.disable_recipe_index()
+    database.disable_pantry_matrix()
+    database.reset_ingredient_dictionary()
+    database.reset_recipe_cache()
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    # Свежая база из resources/ во временной папке; рядом с программой ничего не создаётся.
+    database.close_all_connections()
+    reset_caches()
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "recipes.db"))
+    monkeypatch.setattr(database, "ensure_db_and_resources", lambda: None)
+    database.init_db()
+    yield database
+    database.close_all_connections()
+    reset_caches()
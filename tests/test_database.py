@@ -0,0 +1,67 @@
+import sqlite3
+
+import database
+
+
+class WriteBetweenReads:
+    # Соединение, после первой выборки которого другое соединение добавляет рецепт со связями.
+    def __init__(self, conn, recipe_id):
+        self.conn = conn
+        self.recipe_id = recipe_id
+        self.written = False
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def execute(self, sql, *args):
+        cursor = self.conn.execute(sql, *args)
+        if not self.written and "FROM recipes" in sql:
+            cursor = cursor.fetchall()
+            self.written = True
+            other = sqlite3.connect(database.DB_PATH)
+            with other:
+                other.execute("INSERT INTO recipes (id, name, instructions, image_path) VALUES (?, 'Чужой', '', '')",
+                              (self.recipe_id,))
+                other.execute("INSERT INTO recipe_ingredients (recipe_id, ingredient_id) VALUES (?, 1)",
+                              (self.recipe_id,))
+            other.close()
+        return cursor
+
+
+def test_recipe_details_read_one_snapshot(catalog):
+    new_id = catalog.get_connection().execute("SELECT MAX(id) + 100 FROM recipes").fetchone()[0]
+    conn = WriteBetweenReads(catalog.get_connection(), new_id)
+    details = catalog._load_recipe_details(conn, [1, new_id])
+    assert conn.written
+    assert list(details) == [1]
+    assert details[1][0]['ingredients']
+    assert new_id in catalog._load_recipe_details(catalog.get_connection(), [1, new_id])
+
+
+def index_and_sql_results(db, queries):
+    # Сначала индекс, поддерживаемый записями по месту, затем тот же запрос через SQL.
+    from_index = [list(db.get_recipe_ids_by_ingredients(ids)) for ids in queries]
+    db.disable_recipe_index()
+    from_sql = [list(db.get_recipe_ids_by_ingredients(ids)) for ids in queries]
+    db.enable_recipe_index()
+    return from_index, from_sql
+
+
+def test_recipe_index_matches_sql_after_writes(catalog):
+    catalog.enable_recipe_index()
+    ingredient_ids = [row[0] for row in catalog.get_connection().execute("SELECT id FROM ingredients ORDER BY id")]
+    queries = [[]] + [[ingredient_id] for ingredient_id in ingredient_ids]
+    queries += [ingredient_ids[i:i + 2] for i in range(0, len(ingredient_ids) - 1, 3)]
+    first, second = ingredient_ids[0], ingredient_ids[1]
+
+    steps = [
+        lambda: catalog.add_recipe("Новый", "x", "", [first, second]),
+        lambda: catalog.add_recipe("Без ингредиентов", "x", "", []),
+        lambda: catalog.update_recipe(1, "Изменён", "x", "", [second]),
+        lambda: catalog.update_recipe(2, "Изменён", "x", "", []),
+        lambda: catalog.delete_recipe(3),
+    ]
+    for step in steps:
+        step()
+        from_index, from_sql = index_and_sql_results(catalog, queries)
+        assert from_index == from_sql
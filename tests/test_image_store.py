@@ -0,0 +1,46 @@
+from PyQt6.QtCore import QSize
+from PyQt6.QtGui import QColor, QImage
+
+import image_store
+import thumbnails
+
+
+def test_list_size_reads_stored_thumbnail(catalog, tmp_path, monkeypatch):
+    source = str(tmp_path / "photo.jpg")
+    image = QImage(2000, 1000, QImage.Format.Format_RGB32)
+    image.fill(QColor("tomato"))
+    assert image.save(source, "JPG")
+
+    key = image_store.ingest_image(source)
+    assert image_store.is_store_key(key)
+    full_path = image_store.resolve_image_path(key)
+    thumb_path = image_store.stored_thumbnail(full_path)
+    assert thumb_path == image_store.resolve_thumbnail_path(key)
+    assert image_store.stored_thumbnail(source) is None
+
+    decoded = []
+    decode = thumbnails.QImageReader
+    monkeypatch.setattr(thumbnails, "QImageReader", lambda path: decoded.append(path) or decode(path))
+    assert thumbnails.decode_scaled(full_path, QSize(300, 300)).width() == 300
+    assert thumbnails.decode_scaled(full_path, QSize(800, 800)).width() == 800
+    assert decoded == [thumb_path, full_path]
+
+
+def test_default_image_key_survives_other_working_directory(catalog, tmp_path, monkeypatch):
+    resources = tmp_path / "resources"
+    resources.mkdir()
+    (resources / "def.png").write_bytes(open(catalog.resource_path(catalog.DEFAULT_IMAGE), "rb").read())
+    image_store.migrate_images_to_db()
+    key = image_store.default_image()
+    assert catalog.is_blob_key(key)
+    assert key == catalog.default_image_key()
+
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    monkeypatch.chdir(elsewhere)
+    assert image_store.default_image() == key
+
+
+def test_default_image_without_stored_key_falls_back(catalog):
+    catalog.set_image_storage_mode(catalog.IMAGE_STORAGE_DB)
+    assert image_store.default_image() == catalog.DEFAULT_IMAGE
@@ -0,0 +1,40 @@
+import pytest
+
+import database
+import import_export
+
+EDGE_RECIPES = [
+    {'name': "Без ингредиентов", 'instructions': "Просто подать.", 'image_path': "", 'ingredients': []},
+    {'name': "Без инструкции", 'instructions': "", 'image_path': "resources/def.png", 'ingredients': ["соль"]},
+    {'name': "С абзацами", 'instructions': "1. Нарезать.\n\n2. Смешать.\n   \n-\n\\n не перевод строки",
+     'image_path': "resources/def.png", 'ingredients': ["лук", "морковь"]},
+]
+
+
+def exported(db):
+    # Порядок ингредиентов внутри рецепта база не хранит.
+    return [dict({field: recipe[field] for field in ('name', 'instructions', 'image_path')},
+                 ingredients=sorted(recipe['ingredients']))
+            for recipe in db.iter_recipes_for_export()]
+
+
+@pytest.mark.parametrize("fmt", import_export.FORMATS)
+def test_export_import_round_trip(catalog, tmp_path, monkeypatch, fmt):
+    for recipe in EDGE_RECIPES:
+        catalog.add_recipe_with_ingredients(recipe['name'], recipe['instructions'], recipe['image_path'],
+                                            recipe['ingredients'])
+    before = exported(catalog)
+    path = str(tmp_path / f"catalog.{fmt}")
+    assert import_export.export_file(path, fmt) == len(before)
+
+    database.close_all_connections()
+    database.reset_ingredient_dictionary()
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "imported.db"))
+    conn = database.get_connection()
+    database.create_base_schema(conn)
+    database.migrate_db(conn)
+    assert import_export.import_file(path, fmt) == len(before)
+
+    assert exported(database) == before
+    for recipe in EDGE_RECIPES:
+        assert recipe in before
@@ -0,0 +1,40 @@
+import sys
+import threading
+
+from ingredient_dict import IngredientDictionary
+
+
+def test_readers_survive_concurrent_writes():
+    # Частое переключение потоков, чтобы чтение попадало в середину add/remove.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        dictionary = IngredientDictionary([(1, "молоко"), (2, "мука")])
+        errors = []
+        done = threading.Event()
+
+        def write():
+            for ingredient_id in range(3, 3000):
+                dictionary.add(ingredient_id, f"молоко {ingredient_id}")
+                if ingredient_id > 3:
+                    dictionary.remove(ingredient_id - 1)
+            done.set()
+
+        def read():
+            try:
+                while not done.is_set():
+                    dictionary.suggest("малако")
+                    dictionary.complete("мол")
+                    dictionary.lookup("мука")
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
+    assert dictionary.lookup("мука") == 2
@@ -0,0 +1,32 @@
+import pytest
+
+from live_search import SearchSession
+
+REFINEMENTS = [
+    ["суп", "суп, молоко"],
+    ["яйцо", "яйцо, молоко", "яйцо, молоко, мука"],
+    ["блин", "блин, яйцо", "блин, яйцо, молоко"],
+    ["жарить", "жарить, яйцо", "жарить, яйцо, сыр"],
+    ["яйцо, молоко", "яйцо", "яйцо, молоко"],
+]
+
+
+@pytest.mark.parametrize("with_index", [True, False])
+@pytest.mark.parametrize("queries", REFINEMENTS)
+def test_refined_search_matches_fresh_search(catalog, queries, with_index):
+    if with_index:
+        catalog.enable_recipe_index()
+    session = SearchSession()
+    for text in queries:
+        recipe_ids, hints = session.find(text)
+        fresh_ids, fresh_hints = SearchSession().find(text)
+        assert (list(recipe_ids), hints) == (list(fresh_ids), fresh_hints), text
+
+
+def test_empty_text_refinement_falls_back_to_ingredients(catalog):
+    catalog.enable_recipe_index()
+    session = SearchSession()
+    assert list(session.find("суп")[0])
+    recipe_ids, hints = session.find("суп, молоко")
+    assert list(recipe_ids)
+    assert hints == ["«суп» не найден"]
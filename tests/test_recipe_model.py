@@ -0,0 +1,130 @@
+import random
+
+import pytest
+from PyQt6.QtCore import QCoreApplication
+
+from recipe_model import RecipeListModel, PAGE_SIZE
+
+
+class FakeWorker:
+    # Запросы страниц копятся и выполняются, когда тест скажет.
+    def __init__(self):
+        self.pending = []
+
+    def submit(self, func, recipe_ids, callback=None, error_callback=None, channel=None):
+        self.pending.append((list(recipe_ids), callback))
+
+    def deliver(self):
+        while self.pending:
+            recipe_ids, callback = self.pending.pop(0)
+            callback({recipe_id: f"рецепт {recipe_id}" for recipe_id in recipe_ids})
+
+
+@pytest.fixture
+def model():
+    app = QCoreApplication.instance() or QCoreApplication([])
+    worker = FakeWorker()
+    model = RecipeListModel(worker=worker)
+    model.worker = worker
+    yield model
+    del app
+
+
+def rows(model):
+    return [model.recipe_id(row) for row in range(model.rowCount())]
+
+
+def load_all(model):
+    model.worker.deliver()
+    while model.canFetchMore(model.index(0).parent()):
+        model.fetchMore(model.index(0).parent())
+        model.worker.deliver()
+
+
+def test_pages_arrive_from_worker(model):
+    ids = list(range(1, 2 * PAGE_SIZE + 51))
+    model.set_recipe_ids(ids)
+    assert model.rowCount() == 0
+    model.worker.deliver()
+    assert rows(model) == ids[:PAGE_SIZE]
+    load_all(model)
+    assert rows(model) == ids
+
+
+def test_removed_while_page_in_flight_comes_back(model):
+    ids = list(range(1, PAGE_SIZE + 11))
+    model.set_recipe_ids(ids)
+    model.remove_recipe(5)
+    model.worker.deliver()
+    assert 5 not in rows(model)
+    model.set_recipe(5, "снова подходит")
+    load_all(model)
+    assert rows(model).count(5) == 1
+
+
+def test_removed_before_page_requested_comes_back(model):
+    ids = list(range(1, 2 * PAGE_SIZE + 1))
+    model.set_recipe_ids(ids)
+    model.worker.deliver()
+    model.remove_recipe(PAGE_SIZE + 3)
+    load_all(model)
+    assert PAGE_SIZE + 3 not in rows(model)
+    model.set_recipe(PAGE_SIZE + 3, "снова подходит")
+    assert rows(model)[-1] == PAGE_SIZE + 3
+
+
+def test_removed_and_restored_before_load_keeps_its_place(model):
+    ids = list(range(1, 2 * PAGE_SIZE + 1))
+    model.set_recipe_ids(ids)
+    model.worker.deliver()
+    model.remove_recipe(PAGE_SIZE + 3)
+    model.set_recipe(PAGE_SIZE + 3, "рецепт")
+    load_all(model)
+    assert rows(model) == ids
+
+
+def test_new_recipe_waits_for_unloaded_pages(model):
+    ids = list(range(1, 2 * PAGE_SIZE + 1))
+    model.set_recipe_ids(ids)
+    model.worker.deliver()
+    model.set_recipe(10000, "новый")
+    assert 10000 not in rows(model)
+    load_all(model)
+    assert rows(model) == ids + [10000]
+    model.set_recipe(10001, "ещё новый")
+    assert rows(model)[-1] == 10001
+
+
+def test_removed_loaded_row_comes_back_at_end(model):
+    ids = list(range(1, 21))
+    model.set_recipe_ids(ids)
+    load_all(model)
+    model.remove_recipe(3)
+    assert 3 not in rows(model)
+    model.set_recipe(3, "рецепт 3")
+    assert rows(model) == [i for i in ids if i != 3] + [3]
+
+
+def test_row_of_stays_consistent_under_edits(model):
+    rng = random.Random(23)
+    ids = list(range(1, 2 * PAGE_SIZE + 1))
+    model.set_recipe_ids(ids)
+    load_all(model)
+    expected = list(ids)
+    next_id = 10000
+    for _ in range(500):
+        action = rng.random()
+        if action < 0.5 and expected:
+            recipe_id = rng.choice(expected)
+            model.remove_recipe(recipe_id)
+            expected.remove(recipe_id)
+        elif action < 0.8:
+            model.set_recipe(next_id, "новый")
+            expected.append(next_id)
+            next_id += 1
+        elif expected:
+            recipe_id = rng.choice(expected)
+            assert model.row_of(recipe_id) == expected.index(recipe_id)
+    assert rows(model) == expected
+    assert [model.row_of(recipe_id) for recipe_id in reversed(expected)] == list(reversed(range(len(expected))))
+    assert model.row_of(-1) == -1
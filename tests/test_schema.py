@@ -0,0 +1,57 @@
+import pytest
+
+import database
+
+INGREDIENT_INDEX = "idx_recipe_ingredients_ingredient"
+
+
+def executed_plans(conn, func, *args):
+    # Планы именно тех запросов к recipe_ingredients, которые выполняет функция (значения подставлены в текст).
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        func(*args)
+    finally:
+        conn.set_trace_callback(None)
+    plans = [[row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+             for sql in statements if "recipe_ingredients" in sql]
+    assert plans
+    return plans
+
+
+def ingredient_lookup(conn):
+    return executed_plans(conn, database.get_recipe_ids_by_ingredients, [1, 2])
+
+
+def recipe_ingredients_join(conn):
+    return executed_plans(conn, database._load_recipe_details, conn, [1])
+
+
+@pytest.fixture
+def base_conn(tmp_path, monkeypatch):
+    database.close_all_connections()
+    database.disable_recipe_index()
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "schema.db"))
+    conn = database.get_connection()
+    database.create_base_schema(conn)
+    yield conn
+    database.close_all_connections()
+
+
+def test_base_schema_scans_link_table(base_conn):
+    # Исходная таблица связей без ключей: оба запроса читают её целиком.
+    for plans in (ingredient_lookup(base_conn), recipe_ingredients_join(base_conn)):
+        for plan in plans:
+            assert any(step.startswith("SCAN") and "INDEX" not in step for step in plan), plan
+
+
+def test_migrated_schema_searches_link_table(base_conn):
+    database.migrate_db(base_conn)
+    assert base_conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (INGREDIENT_INDEX,)).fetchone()
+    for plan in ingredient_lookup(base_conn):
+        assert any(f"USING COVERING INDEX {INGREDIENT_INDEX} (ingredient_id=?)" in step for step in plan), plan
+        assert not any(step.startswith("SCAN") for step in plan), plan
+    for plan in recipe_ingredients_join(base_conn):
+        assert any(step.startswith("SEARCH ri USING PRIMARY KEY (recipe_id=?)") for step in plan), plan
+        assert not any(step.startswith("SCAN") for step in plan), plan
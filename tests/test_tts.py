@@ -0,0 +1,95 @@
+import struct
+import threading
+import time
+
+import tts
+
+
+def extensible_wav(seconds, framerate=16000):
+    # Заголовок WAVE_FORMAT_EXTENSIBLE, как у файлов SAPI.
+    byte_rate = framerate * 2
+    fmt = struct.pack("<HHIIHHH", 0xFFFE, 1, framerate, byte_rate, 2, 16, 22) + bytes(22)
+    data = bytes(int(byte_rate * seconds))
+    body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(data)) + data
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+class FakeEngine:
+    def __init__(self, wav_bytes):
+        self.wav_bytes = wav_bytes
+        self.said = []
+        self.release = threading.Event()
+
+    def setProperty(self, name, value):
+        pass
+
+    def getProperty(self, name):
+        return []
+
+    def save_to_file(self, text, path):
+        with open(path, "wb") as f:
+            f.write(self.wav_bytes)
+
+    def say(self, text):
+        self.said.append(text)
+
+    def runAndWait(self):
+        if self.said:
+            self.release.wait(5)
+
+    def stop(self):
+        self.release.set()
+
+
+class FakePlayer:
+    def __init__(self):
+        self.played = []
+
+    def play(self, path):
+        self.played.append(path)
+
+    def stop(self):
+        pass
+
+
+def test_duration_from_extensible_header(tmp_path):
+    path = tmp_path / "sapi.wav"
+    path.write_bytes(extensible_wav(1.5))
+    assert abs(tts.wav_duration(str(path)) - 1.5) < 1e-6
+
+
+def test_duration_of_unfinished_data_chunk(tmp_path):
+    path = tmp_path / "partial.wav"
+    wav = bytearray(extensible_wav(0.5))
+    data_size = wav.index(b"data") + 4
+    wav[data_size:data_size + 4] = struct.pack("<I", 0xFFFFFFFF)
+    path.write_bytes(bytes(wav))
+    assert abs(tts.wav_duration(str(path)) - 0.5) < 1e-6
+
+
+def test_unknown_duration_waits_for_engine(tmp_path):
+    engine = FakeEngine(b"not a wav file")
+    player = FakePlayer()
+    service = tts.SpeechService(driver_factory=lambda: engine, player_factory=lambda: player,
+                                cache_dir=str(tmp_path))
+    try:
+        service.speak("Нарезать лук")
+        assert wait_until(lambda: engine.said)
+        # Движок ещё говорит — задача не считается законченной и следующая не начнётся.
+        assert engine.said == ["Нарезать лук"]
+        assert player.played == []
+        assert service.is_busy()
+        time.sleep(0.1)
+        assert service.is_busy()
+        service.stop()
+        assert engine.release.is_set()
+        assert wait_until(lambda: not service.is_busy())
+    finally:
+        service.shutdown()
@@ -0,0 +1,213 @@
+import os
+import hashlib
+import itertools
+from collections import OrderedDict
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QSize, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QPixmap
+from PyQt6 import sip
+import database
+import instrumentation
+from image_store import THUMBNAIL_SIZE, stored_thumbnail
+
+MEMORY_BUDGET = 64 * 1024 * 1024
+THUMBNAIL_DIR_NAME = "thumbnails"
+
+
+def thumbnail_dir():
+    return os.path.join(os.path.dirname(database.DB_PATH), THUMBNAIL_DIR_NAME)
+
+
+def thumbnail_key(path, size):
+    if database.is_blob_key(path):
+        # Картинка в базе адресуется хэшем содержимого и не меняется.
+        return (path, size.width(), size.height())
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    return (os.path.abspath(path), mtime, size.width(), size.height())
+
+
+def disk_cache_path(cache_dir, key):
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, digest[:2], digest + ".png")
+
+
+def decode_scaled(path, size):
+    # Для картинки из хранилища подходящая миниатюра уже лежит рядом — полную не декодируем.
+    if max(size.width(), size.height()) <= THUMBNAIL_SIZE:
+        path = stored_thumbnail(path) or path
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    image = reader.read()
+    return scale_to(image, size)
+
+
+def decode_blob_scaled(key, size):
+    # Подходит готовая миниатюра из базы — полную картинку не читаем.
+    kind = "thumb" if max(size.width(), size.height()) <= THUMBNAIL_SIZE else "full"
+    image = QImage()
+    data = database.read_image_blob(key, kind)
+    if data is not None:
+        image.loadFromData(data)
+    return scale_to(image, size)
+
+
+def scale_to(image, size):
+    if image.isNull():
+        return image
+    if image.width() > size.width() or image.height() > size.height():
+        image = image.scaled(size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+    return image
+
+
+class PixmapCache:
+    # LRU масштабированных картинок с ограничением по байтам.
+    def __init__(self, budget=MEMORY_BUDGET):
+        self.budget = budget
+        self.used = 0
+        self._items = OrderedDict()
+
+    def get(self, key):
+        pixmap = self._items.get(key)
+        if pixmap is not None:
+            self._items.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap):
+        cost = self.cost(pixmap)
+        if cost > self.budget:
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.used -= self.cost(old)
+        self._items[key] = pixmap
+        self.used += cost
+        while self.used > self.budget:
+            _, evicted = self._items.popitem(last=False)
+            self.used -= self.cost(evicted)
+
+    def clear(self):
+        self._items.clear()
+        self.used = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    @staticmethod
+    def cost(pixmap):
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+
+class _DecodeSignals(QObject):
+    finished = pyqtSignal(int, object, QImage)
+
+
+class _DecodeTask(QRunnable):
+    def __init__(self, request_id, key, path, size, cache_dir, signals):
+        super().__init__()
+        self.request_id = request_id
+        self.key = key
+        self.path = path
+        self.size = size
+        self.cache_dir = cache_dir
+        self.signals = signals
+
+    def run(self):
+        if database.is_blob_key(self.path):
+            with instrumentation.timed("image", "blob decode", self.path):
+                image = decode_blob_scaled(self.path, self.size)
+            self.signals.finished.emit(self.request_id, self.key, image)
+            return
+        cached = disk_cache_path(self.cache_dir, self.key)
+        with instrumentation.timed("image", "disk cache", os.path.basename(self.path)):
+            image = QImage(cached) if os.path.exists(cached) else QImage()
+        if image.isNull():
+            with instrumentation.timed("image", "decode", os.path.basename(self.path)):
+                image = decode_scaled(self.path, self.size)
+            if not image.isNull():
+                os.makedirs(os.path.dirname(cached), exist_ok=True)
+                tmp_path = cached + f".{self.request_id}.tmp"
+                if image.save(tmp_path, "PNG"):
+                    os.replace(tmp_path, cached)
+        self.signals.finished.emit(self.request_id, self.key, image)
+
+
+class ThumbnailService(QObject):
+    def __init__(self, cache_dir=None, budget=MEMORY_BUDGET, parent=None):
+        super().__init__(parent)
+        self.cache_dir = cache_dir or thumbnail_dir()
+        self.memory = PixmapCache(budget)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, min(4, QThreadPool.globalInstance().maxThreadCount())))
+        # Потоки не завершаем: у каждого своё соединение с базой для картинок из recipe_images.
+        self.pool.setExpiryTimeout(-1)
+        self._ids = itertools.count(1)
+        self._latest = {}
+        self._tasks = {}
+        self._signals = _DecodeSignals(self)
+        self._signals.finished.connect(self._on_finished)
+
+    def load_into(self, label, path, placeholder="Загрузка..."):
+        size = QSize(label.width(), label.height())
+        key = thumbnail_key(path, size)
+        target = id(label)
+        self._cancel(target)
+        if key is None:
+            label.clear()
+            label.setText("Фото не найдено")
+            return
+        pixmap = self.memory.get(key)
+        if pixmap is not None:
+            self._show(label, pixmap)
+            return
+        request_id = next(self._ids)
+        task = _DecodeTask(request_id, key, path, size, self.cache_dir, self._signals)
+        task.setAutoDelete(False)
+        self._latest[target] = (request_id, label)
+        self._tasks[request_id] = task
+        label.clear()
+        label.setText(placeholder)
+        self.pool.start(task)
+
+    def _cancel(self, target):
+        # Устаревший запрос снимаем из очереди, а уже запущенный просто не отрисуем.
+        latest = self._latest.pop(target, None)
+        if latest is None:
+            return
+        task = self._tasks.get(latest[0])
+        if task is not None and self.pool.tryTake(task):
+            del self._tasks[latest[0]]
+
+    def _on_finished(self, request_id, key, image):
+        self._tasks.pop(request_id, None)
+        pixmap = QPixmap.fromImage(image) if not image.isNull() else None
+        if pixmap is not None:
+            self.memory.put(key, pixmap)
+        for target, (latest_id, label) in list(self._latest.items()):
+            if latest_id != request_id:
+                continue
+            del self._latest[target]
+            if sip.isdeleted(label):
+                return
+            if pixmap is None:
+                label.clear()
+                label.setText("Фото не найдено")
+            else:
+                self._show(label, pixmap)
+            return
+
+    @staticmethod
+    def _show(label, pixmap):
+        label.setPixmap(pixmap)
+        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+
+_service = None
+
+
+def get_thumbnail_service():
+    global _service
+    if _service is None:
+        _service = ThumbnailService()
+    return _service
@@ -0,0 +1,248 @@
+import os
+import sys
+import queue
+import wave
+import struct
+import hashlib
+import itertools
+import threading
+import database
+
+RATE = 220
+VOLUME = 0.9
+PREFERRED_VOICES = ('david', 'male')
+TTS_CACHE_DIR_NAME = "tts_cache"
+
+
+def default_driver():
+    import pyttsx3
+    return pyttsx3.init()
+
+
+def tts_cache_dir():
+    return os.path.join(os.path.dirname(database.DB_PATH), TTS_CACHE_DIR_NAME)
+
+
+def wav_duration(path):
+    try:
+        with wave.open(path, "rb") as f:
+            frames, framerate = f.getnframes(), f.getframerate()
+        if frames and framerate:
+            return frames / float(framerate)
+    except (OSError, wave.Error, EOFError):
+        pass
+    return riff_duration(path)
+
+
+def riff_duration(path):
+    # Заголовок, который wave не читает (WAVE_FORMAT_EXTENSIBLE у SAPI и т.п.): размер данных делим на байтрейт.
+    try:
+        file_size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            header = f.read(12)
+            if len(header) < 12 or header[:4] != b"RIFF" or header[8:] != b"WAVE":
+                return 0.0
+            byte_rate = 0
+            while True:
+                chunk = f.read(8)
+                if len(chunk) < 8:
+                    return 0.0
+                name, size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+                if name == b"data":
+                    # У недописанного файла размер в заголовке 0 или больше файла — берём остаток.
+                    remaining = file_size - f.tell()
+                    if not size or size > remaining:
+                        size = remaining
+                    return size / float(byte_rate) if byte_rate > 0 else 0.0
+                if name == b"fmt ":
+                    fmt = f.read(size)
+                    if len(fmt) >= 12:
+                        byte_rate = struct.unpack("<I", fmt[8:12])[0]
+                    f.seek(size & 1, 1)
+                else:
+                    f.seek(size + (size & 1), 1)
+    except (OSError, struct.error):
+        return 0.0
+
+
+class WinsoundPlayer:
+    def __init__(self):
+        import winsound
+        self._winsound = winsound
+
+    def play(self, path):
+        self._winsound.PlaySound(path, self._winsound.SND_FILENAME | self._winsound.SND_ASYNC)
+
+    def stop(self):
+        self._winsound.PlaySound(None, 0)
+
+
+def default_player():
+    if sys.platform == "win32":
+        return WinsoundPlayer()
+    return None
+
+
+class SpeechService:
+    # Один поток и один движок на всё приложение; озвученный текст кэшируется в wav-файлах.
+    def __init__(self, driver_factory=default_driver, player_factory=default_player, cache_dir=None,
+                 rate=RATE, volume=VOLUME):
+        self.driver_factory = driver_factory
+        self.player_factory = player_factory
+        self.cache_dir = cache_dir
+        self.rate = rate
+        self.volume = volume
+        self.voice_id = ""
+        self.engine = None
+        self.player = None
+        self._queue = queue.Queue()
+        self._ids = itertools.count(1)
+        self._cancelled = set()
+        self._lock = threading.Lock()
+        self._stop_playback = threading.Event()
+        self._current = None
+        self._engine_speaking = False
+        self._thread = threading.Thread(target=self._run, name="speech", daemon=True)
+        self._thread.start()
+
+    def speak(self, text):
+        text = (text or "").strip()
+        if not text:
+            return None
+        job_id = next(self._ids)
+        self._queue.put((job_id, text))
+        return job_id
+
+    def cancel(self, job_id):
+        with self._lock:
+            self._cancelled.add(job_id)
+            current = self._current == job_id
+        if current:
+            self._interrupt()
+
+    def stop(self):
+        # Снимает всю очередь и прерывает текущую озвучку.
+        with self._lock:
+            while True:
+                try:
+                    job = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    self._cancelled.add(job[0])
+            busy = self._current is not None
+        if busy:
+            self._interrupt()
+
+    def is_busy(self):
+        with self._lock:
+            return self._current is not None or not self._queue.empty()
+
+    def shutdown(self):
+        self.stop()
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def cache_path(self, text):
+        key = f"{self.voice_id}|{self.rate}|{self.volume}|{text}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir or tts_cache_dir(), digest[:2], digest + ".wav")
+
+    def _interrupt(self):
+        self._stop_playback.set()
+        if self.player is not None:
+            self.player.stop()
+        if self.engine is not None and (self.player is None or self._engine_speaking):
+            self.engine.stop()
+
+    def _init_engine(self):
+        self.engine = self.driver_factory()
+        self.engine.setProperty('rate', self.rate)
+        self.engine.setProperty('volume', self.volume)
+        voices = self.engine.getProperty('voices') or []
+        for voice in voices:
+            if any(name in voice.name.lower() for name in PREFERRED_VOICES):
+                self.voice_id = voice.id
+                print(f"[!] Установлен голос: {voice.name}")
+                break
+        else:
+            if voices:
+                self.voice_id = voices[0].id
+                print(f"[!] Установлен первый доступный голос: {voices[0].name}")
+        if self.voice_id:
+            self.engine.setProperty('voice', self.voice_id)
+        self.player = self.player_factory() if self.player_factory else None
+
+    def _render(self, text):
+        path = self.cache_path(text)
+        if os.path.exists(path):
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path[:-4] + ".tmp.wav"
+        self.engine.save_to_file(text, tmp_path)
+        self.engine.runAndWait()
+        if not os.path.exists(tmp_path):
+            return None
+        os.replace(tmp_path, path)
+        return path
+
+    def _say(self, text):
+        # runAndWait возвращается, когда движок договорил или его остановили.
+        self._engine_speaking = True
+        try:
+            if self._stop_playback.is_set():
+                return
+            self.engine.say(text)
+            self.engine.runAndWait()
+        finally:
+            self._engine_speaking = False
+
+    def _play(self, text):
+        if self.player is None:
+            self._say(text)
+            return
+        path = self._render(text)
+        if path is None or self._stop_playback.is_set():
+            return
+        duration = wav_duration(path)
+        if duration <= 0:
+            # Без длительности не узнать, когда закончится воспроизведение: говорим движком.
+            print(f"[!] Не удалось определить длительность {path}, озвучка без кэша")
+            self._say(text)
+            return
+        self.player.play(path)
+        if self._stop_playback.wait(duration):
+            self.player.stop()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            job_id, text = job
+            with self._lock:
+                if job_id in self._cancelled:
+                    self._cancelled.discard(job_id)
+                    continue
+                self._current = job_id
+                self._stop_playback.clear()
+            try:
+                if self.engine is None:
+                    self._init_engine()
+                self._play(text)
+            except Exception as e:
+                print(f"[!] Ошибка озвучки: {e}")
+            finally:
+                with self._lock:
+                    self._current = None
+                    self._cancelled.discard(job_id)
+
+
+_service = None
+
+
+def get_speech_service():
+    global _service
+    if _service is None:
+        _service = SpeechService()
+    return _service
@@ -0,0 +1,78 @@
+import os
+import io
+import hashlib
+import importlib
+
+UI_DIR = os.path.dirname(os.path.abspath(__file__))
+FORMS = ("main", "newrecipe", "editrecipe")
+HASH_PREFIX = "UI_SOURCE_SHA1 = "
+
+
+def form_path(name):
+    return os.path.join(UI_DIR, f"{name}.ui")
+
+
+def compiled_path(name):
+    return os.path.join(UI_DIR, f"{name}_ui.py")
+
+
+def source_hash(name):
+    # Концы строк не учитываем: git на Windows может переписать их при checkout.
+    with open(form_path(name), "rb") as f:
+        return hashlib.sha1(f.read().replace(b"\r\n", b"\n")).hexdigest()
+
+
+def compile_form(name):
+    from PyQt6 import uic
+    out = io.StringIO()
+    cwd = os.getcwd()
+    # Компилируем из папки ui, чтобы в заголовок модуля не попал абсолютный путь.
+    os.chdir(UI_DIR)
+    try:
+        uic.compileUi(f"{name}.ui", out)
+    finally:
+        os.chdir(cwd)
+    with open(compiled_path(name), "w", encoding="utf-8", newline="\n") as f:
+        f.write(out.getvalue())
+        f.write(f"\n\n{HASH_PREFIX}{source_hash(name)!r}\n")
+
+
+def is_fresh(module, name):
+    # В собранном exe .ui может не оказаться — тогда доверяем скомпилированному модулю.
+    if not os.path.exists(form_path(name)):
+        return True
+    return getattr(module, "UI_SOURCE_SHA1", None) == source_hash(name)
+
+
+_form_classes = {}
+
+
+def _compiled_class(name):
+    # Свежесть проверяем один раз за запуск.
+    if name not in _form_classes:
+        _form_classes[name] = _load_compiled_class(name)
+    return _form_classes[name]
+
+
+def _load_compiled_class(name):
+    try:
+        module = importlib.import_module(f"{__name__}.{name}_ui")
+    except ImportError:
+        print(f"[!] Нет скомпилированной формы ui/{name}_ui.py, загружаю {name}.ui")
+        return None
+    if not is_fresh(module, name):
+        print(f"[!] Форма ui/{name}_ui.py устарела, загружаю {name}.ui (пересоберите: python -m ui.build)")
+        return None
+    return next(getattr(module, attr) for attr in dir(module) if attr.startswith("Ui_"))
+
+
+def setup_form(widget, name):
+    # Как uic.loadUi: дочерние виджеты становятся атрибутами widget.
+    form_class = _compiled_class(name)
+    if form_class is None:
+        from PyQt6 import uic
+        uic.loadUi(form_path(name), widget)
+        return
+    form = form_class()
+    form.setupUi(widget)
+    vars(widget).update(vars(form))
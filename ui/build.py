@@ -0,0 +1,38 @@
+import argparse
+import importlib
+import sys
+
+from ui import FORMS, compile_form, compiled_path, is_fresh
+
+
+def stale_forms():
+    stale = []
+    for name in FORMS:
+        try:
+            module = importlib.import_module(f"ui.{name}_ui")
+        except ImportError:
+            stale.append(name)
+            continue
+        if not is_fresh(module, name):
+            stale.append(name)
+    return stale
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Компиляция ui/*.ui в модули Python")
+    parser.add_argument("--check", action="store_true", help="только проверить, что модули не устарели")
+    args = parser.parse_args(argv)
+
+    stale = stale_forms()
+    if args.check:
+        for name in stale:
+            print(f"[!] Устарела форма: {compiled_path(name)}")
+        return 1 if stale else 0
+    for name in FORMS:
+        compile_form(name)
+        print(f"[!] Скомпилирована форма: {compiled_path(name)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
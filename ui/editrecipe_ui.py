@@ -0,0 +1,74 @@
+# Form implementation generated from reading ui file 'editrecipe.ui'
+#
+# Created by: PyQt6 UI code generator 6.11.0
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic6 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+
+
+class Ui_EditRecipeDialog(object):
+    def setupUi(self, EditRecipeDialog):
+        EditRecipeDialog.setObjectName("EditRecipeDialog")
+        EditRecipeDialog.setWindowModality(QtCore.Qt.WindowModality.WindowModal)
+        EditRecipeDialog.resize(550, 550)
+        self.verticalLayout = QtWidgets.QVBoxLayout(EditRecipeDialog)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.label = QtWidgets.QLabel(parent=EditRecipeDialog)
+        self.label.setObjectName("label")
+        self.verticalLayout.addWidget(self.label)
+        self.lineEdit_name = QtWidgets.QLineEdit(parent=EditRecipeDialog)
+        self.lineEdit_name.setObjectName("lineEdit_name")
+        self.verticalLayout.addWidget(self.lineEdit_name)
+        self.label_2 = QtWidgets.QLabel(parent=EditRecipeDialog)
+        self.label_2.setObjectName("label_2")
+        self.verticalLayout.addWidget(self.label_2)
+        self.lineEdit_ingredients = QtWidgets.QLineEdit(parent=EditRecipeDialog)
+        self.lineEdit_ingredients.setObjectName("lineEdit_ingredients")
+        self.verticalLayout.addWidget(self.lineEdit_ingredients)
+        self.label_3 = QtWidgets.QLabel(parent=EditRecipeDialog)
+        self.label_3.setObjectName("label_3")
+        self.verticalLayout.addWidget(self.label_3)
+        self.textEdit_instructions = QtWidgets.QTextEdit(parent=EditRecipeDialog)
+        self.textEdit_instructions.setObjectName("textEdit_instructions")
+        self.verticalLayout.addWidget(self.textEdit_instructions)
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.label_preview = QtWidgets.QLabel(parent=EditRecipeDialog)
+        self.label_preview.setScaledContents(False)
+        self.label_preview.setMinimumSize(QtCore.QSize(150, 150))
+        self.label_preview.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.label_preview.setObjectName("label_preview")
+        self.horizontalLayout.addWidget(self.label_preview)
+        self.btn_browse = QtWidgets.QPushButton(parent=EditRecipeDialog)
+        self.btn_browse.setObjectName("btn_browse")
+        self.horizontalLayout.addWidget(self.btn_browse)
+        self.verticalLayout.addLayout(self.horizontalLayout)
+        self.horizontalLayout_2 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.btn_save = QtWidgets.QPushButton(parent=EditRecipeDialog)
+        self.btn_save.setObjectName("btn_save")
+        self.horizontalLayout_2.addWidget(self.btn_save)
+        self.btn_cancel = QtWidgets.QPushButton(parent=EditRecipeDialog)
+        self.btn_cancel.setObjectName("btn_cancel")
+        self.horizontalLayout_2.addWidget(self.btn_cancel)
+        self.verticalLayout.addLayout(self.horizontalLayout_2)
+
+        self.retranslateUi(EditRecipeDialog)
+        QtCore.QMetaObject.connectSlotsByName(EditRecipeDialog)
+
+    def retranslateUi(self, EditRecipeDialog):
+        _translate = QtCore.QCoreApplication.translate
+        EditRecipeDialog.setWindowTitle(_translate("EditRecipeDialog", "Редактировать рецепт"))
+        self.label.setText(_translate("EditRecipeDialog", "Название рецепта:"))
+        self.label_2.setText(_translate("EditRecipeDialog", "Ингредиенты (через запятую):"))
+        self.label_3.setText(_translate("EditRecipeDialog", "Инструкция по приготовлению:"))
+        self.label_preview.setText(_translate("EditRecipeDialog", "Предпросмотр изображения"))
+        self.btn_browse.setText(_translate("EditRecipeDialog", "Выбрать фото"))
+        self.btn_save.setText(_translate("EditRecipeDialog", "Сохранить"))
+        self.btn_cancel.setText(_translate("EditRecipeDialog", "Отмена"))
+
+
+UI_SOURCE_SHA1 = '81cb77e6dea2e68f0bc8c49bea97e2f19b6b8036'
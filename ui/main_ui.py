@@ -0,0 +1,97 @@
+# Form implementation generated from reading ui file 'main.ui'
+#
+# Created by: PyQt6 UI code generator 6.11.0
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic6 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+
+
+class Ui_MainWindow(object):
+    def setupUi(self, MainWindow):
+        MainWindow.setObjectName("MainWindow")
+        MainWindow.resize(900, 600)
+        self.centralwidget = QtWidgets.QWidget(parent=MainWindow)
+        self.centralwidget.setObjectName("centralwidget")
+        self.horizontalLayout = QtWidgets.QHBoxLayout(self.centralwidget)
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.listView_recipes = QtWidgets.QListView(parent=self.centralwidget)
+        self.listView_recipes.setUniformItemSizes(True)
+        self.listView_recipes.setObjectName("listView_recipes")
+        self.horizontalLayout.addWidget(self.listView_recipes)
+        self.verticalLayout = QtWidgets.QVBoxLayout()
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.label_image = QtWidgets.QLabel(parent=self.centralwidget)
+        self.label_image.setScaledContents(False)
+        self.label_image.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.label_image.setMinimumSize(QtCore.QSize(300, 300))
+        self.label_image.setObjectName("label_image")
+        self.verticalLayout.addWidget(self.label_image)
+        self.scrollArea = QtWidgets.QScrollArea(parent=self.centralwidget)
+        self.scrollArea.setWidgetResizable(True)
+        self.scrollArea.setObjectName("scrollArea")
+        self.scrollAreaWidgetContents = QtWidgets.QWidget()
+        self.scrollAreaWidgetContents.setGeometry(QtCore.QRect(0, 0, 500, 150))
+        self.scrollAreaWidgetContents.setObjectName("scrollAreaWidgetContents")
+        self.verticalLayout_2 = QtWidgets.QVBoxLayout(self.scrollAreaWidgetContents)
+        self.verticalLayout_2.setObjectName("verticalLayout_2")
+        self.textEdit_instructions = QtWidgets.QTextEdit(parent=self.scrollAreaWidgetContents)
+        self.textEdit_instructions.setReadOnly(True)
+        self.textEdit_instructions.setObjectName("textEdit_instructions")
+        self.verticalLayout_2.addWidget(self.textEdit_instructions)
+        self.label_ingredients_title = QtWidgets.QLabel(parent=self.scrollAreaWidgetContents)
+        self.label_ingredients_title.setAlignment(QtCore.Qt.AlignmentFlag.AlignLeading|QtCore.Qt.AlignmentFlag.AlignLeft|QtCore.Qt.AlignmentFlag.AlignTop)
+        self.label_ingredients_title.setObjectName("label_ingredients_title")
+        self.verticalLayout_2.addWidget(self.label_ingredients_title)
+        self.listWidget_ingredients = QtWidgets.QListWidget(parent=self.scrollAreaWidgetContents)
+        self.listWidget_ingredients.setObjectName("listWidget_ingredients")
+        self.verticalLayout_2.addWidget(self.listWidget_ingredients)
+        self.scrollArea.setWidget(self.scrollAreaWidgetContents)
+        self.verticalLayout.addWidget(self.scrollArea)
+        self.horizontalLayout_2 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.lineEdit_search = QtWidgets.QLineEdit(parent=self.centralwidget)
+        self.lineEdit_search.setObjectName("lineEdit_search")
+        self.horizontalLayout_2.addWidget(self.lineEdit_search)
+        self.btn_search = QtWidgets.QPushButton(parent=self.centralwidget)
+        self.btn_search.setObjectName("btn_search")
+        self.horizontalLayout_2.addWidget(self.btn_search)
+        self.checkBox_pantry = QtWidgets.QCheckBox(parent=self.centralwidget)
+        self.checkBox_pantry.setObjectName("checkBox_pantry")
+        self.horizontalLayout_2.addWidget(self.checkBox_pantry)
+        self.verticalLayout.addLayout(self.horizontalLayout_2)
+        self.horizontalLayout_3 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_3.setObjectName("horizontalLayout_3")
+        self.btn_add = QtWidgets.QPushButton(parent=self.centralwidget)
+        self.btn_add.setObjectName("btn_add")
+        self.horizontalLayout_3.addWidget(self.btn_add)
+        self.btn_delete = QtWidgets.QPushButton(parent=self.centralwidget)
+        self.btn_delete.setObjectName("btn_delete")
+        self.horizontalLayout_3.addWidget(self.btn_delete)
+        self.btn_speak = QtWidgets.QPushButton(parent=self.centralwidget)
+        self.btn_speak.setObjectName("btn_speak")
+        self.horizontalLayout_3.addWidget(self.btn_speak)
+        self.verticalLayout.addLayout(self.horizontalLayout_3)
+        self.horizontalLayout.addLayout(self.verticalLayout)
+        MainWindow.setCentralWidget(self.centralwidget)
+
+        self.retranslateUi(MainWindow)
+        QtCore.QMetaObject.connectSlotsByName(MainWindow)
+
+    def retranslateUi(self, MainWindow):
+        _translate = QtCore.QCoreApplication.translate
+        MainWindow.setWindowTitle(_translate("MainWindow", "Книга Рецептов"))
+        self.label_image.setText(_translate("MainWindow", "Фото блюда"))
+        self.label_ingredients_title.setText(_translate("MainWindow", "Ингредиенты:"))
+        self.lineEdit_search.setPlaceholderText(_translate("MainWindow", "перечислите ингредиенты с маленькой буквы через запятую"))
+        self.btn_search.setText(_translate("MainWindow", "Найти"))
+        self.checkBox_pantry.setToolTip(_translate("MainWindow", "Рецепты, для которых есть больше всего ингредиентов из списка"))
+        self.checkBox_pantry.setText(_translate("MainWindow", "Что приготовить"))
+        self.btn_add.setText(_translate("MainWindow", "Добавить"))
+        self.btn_delete.setText(_translate("MainWindow", "Удалить"))
+        self.btn_speak.setText(_translate("MainWindow", "Озвучить"))
+
+
+UI_SOURCE_SHA1 = '34e3343ce9dc255e2154477c460614f5048056c7'
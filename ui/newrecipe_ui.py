@@ -0,0 +1,73 @@
+# Form implementation generated from reading ui file 'newrecipe.ui'
+#
+# Created by: PyQt6 UI code generator 6.11.0
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic6 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+
+
+class Ui_NewRecipeDialog(object):
+    def setupUi(self, NewRecipeDialog):
+        NewRecipeDialog.setObjectName("NewRecipeDialog")
+        NewRecipeDialog.setWindowModality(QtCore.Qt.WindowModality.WindowModal)
+        NewRecipeDialog.resize(550, 500)
+        self.verticalLayout = QtWidgets.QVBoxLayout(NewRecipeDialog)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.label = QtWidgets.QLabel(parent=NewRecipeDialog)
+        self.label.setObjectName("label")
+        self.verticalLayout.addWidget(self.label)
+        self.lineEdit_name = QtWidgets.QLineEdit(parent=NewRecipeDialog)
+        self.lineEdit_name.setObjectName("lineEdit_name")
+        self.verticalLayout.addWidget(self.lineEdit_name)
+        self.label_2 = QtWidgets.QLabel(parent=NewRecipeDialog)
+        self.label_2.setObjectName("label_2")
+        self.verticalLayout.addWidget(self.label_2)
+        self.lineEdit_ingredients = QtWidgets.QLineEdit(parent=NewRecipeDialog)
+        self.lineEdit_ingredients.setObjectName("lineEdit_ingredients")
+        self.verticalLayout.addWidget(self.lineEdit_ingredients)
+        self.label_3 = QtWidgets.QLabel(parent=NewRecipeDialog)
+        self.label_3.setObjectName("label_3")
+        self.verticalLayout.addWidget(self.label_3)
+        self.textEdit_instructions = QtWidgets.QTextEdit(parent=NewRecipeDialog)
+        self.textEdit_instructions.setObjectName("textEdit_instructions")
+        self.verticalLayout.addWidget(self.textEdit_instructions)
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.label_preview = QtWidgets.QLabel(parent=NewRecipeDialog)
+        self.label_preview.setScaledContents(True)
+        self.label_preview.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.label_preview.setObjectName("label_preview")
+        self.horizontalLayout.addWidget(self.label_preview)
+        self.btn_browse = QtWidgets.QPushButton(parent=NewRecipeDialog)
+        self.btn_browse.setObjectName("btn_browse")
+        self.horizontalLayout.addWidget(self.btn_browse)
+        self.verticalLayout.addLayout(self.horizontalLayout)
+        self.horizontalLayout_2 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.btn_save = QtWidgets.QPushButton(parent=NewRecipeDialog)
+        self.btn_save.setObjectName("btn_save")
+        self.horizontalLayout_2.addWidget(self.btn_save)
+        self.btn_cancel = QtWidgets.QPushButton(parent=NewRecipeDialog)
+        self.btn_cancel.setObjectName("btn_cancel")
+        self.horizontalLayout_2.addWidget(self.btn_cancel)
+        self.verticalLayout.addLayout(self.horizontalLayout_2)
+
+        self.retranslateUi(NewRecipeDialog)
+        QtCore.QMetaObject.connectSlotsByName(NewRecipeDialog)
+
+    def retranslateUi(self, NewRecipeDialog):
+        _translate = QtCore.QCoreApplication.translate
+        NewRecipeDialog.setWindowTitle(_translate("NewRecipeDialog", "Добавить рецепт"))
+        self.label.setText(_translate("NewRecipeDialog", "Название рецепта:"))
+        self.label_2.setText(_translate("NewRecipeDialog", "Ингредиенты (через запятую):"))
+        self.label_3.setText(_translate("NewRecipeDialog", "Инструкция по приготовлению:"))
+        self.label_preview.setText(_translate("NewRecipeDialog", "Предпросмотр изображения"))
+        self.btn_browse.setText(_translate("NewRecipeDialog", "Выбрать фото"))
+        self.btn_save.setText(_translate("NewRecipeDialog", "Сохранить"))
+        self.btn_cancel.setText(_translate("NewRecipeDialog", "Отмена"))
+
+
+UI_SOURCE_SHA1 = 'fc6f59730e3fde0454cea2bedeca9fc242b1631c'